@@ -0,0 +1,9 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Test transactions are rolled back without sending signals, so cached
+    # data must not outlive the test that produced it.
+    cache.clear()
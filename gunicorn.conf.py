@@ -0,0 +1,15 @@
+def post_worker_init(worker):
+    from task_manager.warmup import warm_up_templates
+
+    loaded, failed = warm_up_templates()
+    worker.log.info(
+        "Compiled %s templates, skipped %s", len(loaded), len(failed)
+    )
+
+
+def worker_exit(server, worker):
+    from task_manager.reporting import get_report_queue
+
+    reports = get_report_queue()
+    reports.flush(reports.exit_timeout)
+    worker.log.info("Error reports: %s", reports.stats())
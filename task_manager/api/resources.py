@@ -0,0 +1,290 @@
+from collections import defaultdict
+
+from django.db.models import F
+from django.utils.translation import gettext as _
+
+from task_manager.label.forms import LabelForm
+from task_manager.label.models import Label
+from task_manager.status.forms import StatusForm
+from task_manager.status.models import Status
+from task_manager.task.filters import TaskFilter
+from task_manager.task.forms import TaskForm
+from task_manager.task.models import Task, TaskLabel
+from task_manager.user.forms import UserForm
+from task_manager.user.models import User
+
+
+class ApiError(Exception):
+
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+class Field:
+
+    def __init__(self, column, convert=None, related=None):
+        self.column = column
+        self.convert = convert
+        self.related = related
+
+
+class ManyField:
+
+    def __init__(self, through, source, target, related):
+        self.through = through
+        self.source = source
+        self.target = target
+        self.related = related
+
+    def fetch(self, pks):
+        values = defaultdict(list)
+        rows = self.through.objects.filter(
+            **{f'{self.source}__in': pks}
+        ).values_list(self.source, self.target).order_by(self.target)
+        for pk, related_pk in rows:
+            values[pk].append(related_pk)
+        return values
+
+
+class Resource:
+    # Fields map to the columns read with values(), so serializing a page is
+    # a loop over dicts without model instances or field introspection.
+    model = None
+    name = None
+    form_class = None
+    fields = {}
+    ordering = ('id',)
+    filterset_class = None
+    version_field = None
+
+    def __init__(self, request):
+        self.request = request
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def filter_queryset(self, queryset):
+        if self.filterset_class is None:
+            return queryset
+        filterset = self.filterset_class(
+            self.request.GET, queryset=queryset, request=self.request
+        )
+        if not filterset.is_valid():
+            raise ApiError(
+                400, _("Invalid filter."), filterset.errors.get_json_data()
+            )
+        return filterset.qs
+
+    def get_field_names(self):
+        names = self.request.GET.get('fields')
+        if not names:
+            return list(self.fields)
+        # Included relations need their ids, so they are always selected.
+        names = ['id'] + [
+            name for name in (
+                names.split(',') + self.get_include_names()
+            ) if name and name != 'id'
+        ]
+        names = list(dict.fromkeys(names))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(
+                400, _("Unknown fields: %(fields)s") % {
+                    'fields': ', '.join(unknown)
+                }
+            )
+        return names
+
+    def get_columns(self, names):
+        return [
+            self.fields[name].column for name in names
+            if isinstance(self.fields[name], Field)
+        ]
+
+    def serialize(self, rows, names):
+        plain = [
+            (name, field.column, field.convert)
+            for name, field in self.fields.items()
+            if name in names and isinstance(field, Field)
+        ]
+        many = [
+            (name, field.fetch([row['id'] for row in rows]))
+            for name, field in self.fields.items()
+            if name in names and isinstance(field, ManyField)
+        ]
+        data = []
+        for row in rows:
+            item = {
+                name: convert(row[column]) if convert else row[column]
+                for name, column, convert in plain
+            }
+            for name, values in many:
+                item[name] = values.get(row['id'], [])
+            data.append(item)
+        return data
+
+    def get_include_names(self):
+        names = self.request.GET.get('include')
+        return names.split(',') if names else []
+
+    def get_included(self, data):
+        if not self.get_include_names():
+            return None
+        included = {}
+        for name in self.get_include_names():
+            field = self.fields.get(name)
+            if field is None or field.related is None:
+                raise ApiError(
+                    400, _("Cannot include %(name)s") % {'name': name}
+                )
+            ids = set()
+            for item in data:
+                value = item.get(name)
+                ids.update(value if isinstance(value, list) else [value])
+            ids.discard(None)
+            related = RESOURCES[field.related](self.request)
+            names = list(related.fields)
+            rows = related.get_queryset().filter(pk__in=ids).values(
+                *related.get_columns(names)
+            ).order_by('pk')
+            included.setdefault(field.related, {}).update(
+                (item['id'], item) for item in related.serialize(rows, names)
+            )
+        return {
+            name: list(items.values()) for name, items in included.items()
+        }
+
+    def get_form_data(self, payload, instance=None):
+        data = {}
+        if instance is not None:
+            for name in self.form_class._meta.fields:
+                value = getattr(instance, name, None)
+                if hasattr(value, 'all'):
+                    value = [obj.pk for obj in value.all()]
+                data[name] = getattr(value, 'pk', value)
+        data.update(payload)
+        return data
+
+    def save(self, form):
+        return form.save()
+
+    def swap_version(self, instance, version=None):
+        # The compare-and-swap of utils.UpdateViewMixin. It is optional for
+        # API clients, an update without a version only moves it on, so
+        # forms opened before still notice the change.
+        if self.version_field is None:
+            return
+        if version is not None and (
+            not isinstance(version, int) or isinstance(version, bool)
+        ):
+            raise ApiError(400, _("Version must be an integer."))
+        rows = self.model._default_manager.filter(pk=instance.pk)
+        if version is not None:
+            rows = rows.filter(**{self.version_field: version})
+        if not rows.update(**{self.version_field: F(self.version_field) + 1}):
+            raise ApiError(
+                409, _("The object has been changed meanwhile."), {
+                    self.version_field: getattr(instance, self.version_field)
+                }
+            )
+        instance.refresh_from_db(fields=[self.version_field])
+
+    def check_change(self, instance):
+        pass
+
+    def check_delete(self, instance):
+        self.check_change(instance)
+
+
+class StatusResource(Resource):
+    model = Status
+    name = 'statuses'
+    form_class = StatusForm
+    version_field = 'version'
+    fields = {
+        'id': Field('id'),
+        'name': Field('name'),
+        'created_at': Field('created_at', isoformat),
+        'version': Field('version'),
+    }
+
+
+class LabelResource(Resource):
+    model = Label
+    name = 'labels'
+    form_class = LabelForm
+    fields = {
+        'id': Field('id'),
+        'name': Field('name'),
+        'created_at': Field('created_at', isoformat),
+        'task_count': Field('task_count'),
+    }
+
+
+class UserResource(Resource):
+    model = User
+    name = 'users'
+    form_class = UserForm
+    fields = {
+        'id': Field('id'),
+        'username': Field('username'),
+        'first_name': Field('first_name'),
+        'last_name': Field('last_name'),
+        'created_at': Field('created_at', isoformat),
+    }
+
+    def check_change(self, instance):
+        if instance.pk != self.request.user.pk:
+            raise ApiError(
+                403, _("You don't have permission to edit this user.")
+            )
+
+
+class TaskResource(Resource):
+    model = Task
+    name = 'tasks'
+    form_class = TaskForm
+    filterset_class = TaskFilter
+    ordering = ('-created_at', '-id')
+    version_field = 'version'
+    fields = {
+        'id': Field('id'),
+        'name': Field('name'),
+        'description': Field('description'),
+        'status': Field('status_id', related='statuses'),
+        'creator': Field('creator_id', related='users'),
+        'executor': Field('executor_id', related='users'),
+        'labels': ManyField(TaskLabel, 'task_id', 'label_id', 'labels'),
+        'created_at': Field('created_at', isoformat),
+        'updated_at': Field('updated_at', isoformat),
+        'version': Field('version'),
+    }
+
+    def save(self, form):
+        task = form.save(commit=False)
+        if task.pk is None:
+            task.creator = self.request.user
+        task.save()
+        form.save_m2m()
+        return task
+
+    def check_delete(self, instance):
+        if instance.creator_id != self.request.user.pk:
+            raise ApiError(
+                403, _("Task can be deleted only by its creator.")
+            )
+
+
+RESOURCES = {
+    resource.name: resource
+    for resource in (
+        StatusResource, LabelResource, UserResource, TaskResource
+    )
+}
@@ -0,0 +1,162 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from task_manager.benchmarks import generate_tasks
+from task_manager.status.models import Status
+from task_manager.task.models import Task
+from task_manager.user.models import User
+from task_manager.utils import BaseTestCase
+
+
+class ApiTestCase(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.login_user(self.user)
+
+    def send(self, method, name, data=None, pk=None):
+        url = reverse(name, args=[pk] if pk else [])
+        return getattr(self.client, method)(
+            url, json.dumps(data), content_type='application/json'
+        )
+
+
+class TestApiRead(ApiTestCase):
+
+    def test_task_list(self):
+        response = self.client.get(reverse('api_task_list'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(
+            [task['id'] for task in data],
+            list(Task.objects.values_list('id', flat=True))
+        )
+        task = next(task for task in data if task['id'] == 1)
+        self.assertEqual(task['labels'], [2, 3])
+        self.assertEqual(task['status'], 2)
+
+    def test_sparse_fields_and_include(self):
+        response = self.client.get(reverse('api_task_list'), {
+            'fields': 'name,status', 'include': 'status,labels'
+        })
+        content = response.json()
+        self.assertEqual(
+            set(content['data'][0]), {'id', 'name', 'status', 'labels'}
+        )
+        self.assertEqual(
+            {status['id'] for status in content['included']['statuses']},
+            set(Task.objects.values_list('status_id', flat=True))
+        )
+        self.assertEqual(
+            {label['id'] for label in content['included']['labels']}, {2, 3}
+        )
+        response = self.client.get(reverse('api_task_list'), {
+            'fields': 'unknown'
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_filter_and_cursor(self):
+        response = self.client.get(
+            reverse('api_task_list'), {'status': 2, 'fields': 'status'}
+        )
+        self.assertEqual(
+            [task['status'] for task in response.json()['data']], [2]
+        )
+        first = self.client.get(
+            reverse('api_task_list'), {'per_page': 1}
+        ).json()
+        second = self.client.get(
+            reverse('api_task_list'), {'per_page': 1, 'cursor': first['next']}
+        ).json()
+        self.assertNotEqual(first['data'], second['data'])
+        self.assertIsNone(second['next'])
+        response = self.client.get(reverse('api_task_list'), {'status': 999})
+        self.assertEqual(response.status_code, 400)
+
+    def test_large_page_queries(self):
+        generate_tasks(1000, batch_size=500)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('api_task_list'), {'per_page': 1000}
+            )
+        self.assertEqual(len(response.json()['data']), 1000)
+        self.assertLessEqual(len(queries), 4)
+
+    def test_authentication(self):
+        self.client.logout()
+        response = self.client.get(reverse('api_task_list'))
+        self.assertEqual(response.status_code, 401)
+        response = self.client.get(reverse('api_user_list'))
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('api_status_detail', args=[999]))
+        self.assertEqual(response.status_code, 401)
+
+
+class TestApiWrite(ApiTestCase):
+
+    def test_create_update_delete_task(self):
+        response = self.send('post', 'api_task_list', {
+            'name': 'api_task', 'status': 1, 'labels': [1]
+        })
+        self.assertEqual(response.status_code, 201)
+        data = response.json()['data']
+        self.assertEqual(data['creator'], self.user.id)
+        self.assertEqual(data['labels'], [1])
+        response = self.send(
+            'patch', 'api_task_detail', {'name': 'renamed'}, data['id']
+        )
+        self.assertEqual(response.json()['data']['name'], 'renamed')
+        self.assertEqual(response.json()['data']['labels'], [1])
+        response = self.send('put', 'api_task_detail', {
+            'name': 'replaced', 'status': 2
+        }, data['id'])
+        self.assertEqual(response.json()['data']['labels'], [])
+        response = self.send('delete', 'api_task_detail', pk=data['id'])
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Task.objects.filter(id=data['id']).exists())
+
+    def test_invalid_data(self):
+        response = self.send('post', 'api_task_list', {'name': 'testtask'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['details']), {'name', 'status'})
+        response = self.client.post(
+            reverse('api_status_list'), 'not json',
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_stale_version_conflicts(self):
+        version = Status.objects.get(id=2).version
+        response = self.send(
+            'patch', 'api_status_detail', {'name': 'first'}, pk=2
+        )
+        self.assertEqual(response.json()['data']['version'], version + 1)
+        response = self.send('patch', 'api_status_detail', {
+            'name': 'second', 'version': version
+        }, pk=2)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['details'], {'version': version + 1})
+        self.assertEqual(Status.objects.get(id=2).name, 'first')
+        response = self.send('patch', 'api_status_detail', {
+            'name': '', 'version': version + 1
+        }, pk=2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Status.objects.get(id=2).version, version + 1)
+        response = self.send('patch', 'api_status_detail', {
+            'version': 'x'
+        }, pk=2)
+        self.assertEqual(response.status_code, 400)
+
+    def test_permissions(self):
+        response = self.send('delete', 'api_task_detail', pk=2)
+        self.assertEqual(response.status_code, 403)
+        response = self.send('patch', 'api_user_detail', {}, pk=2)
+        self.assertEqual(response.status_code, 403)
+        response = self.send('delete', 'api_status_detail', pk=2)
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Status.objects.filter(id=2).exists())
+        response = self.send('delete', 'api_task_detail', pk=999)
+        self.assertEqual(response.status_code, 404)
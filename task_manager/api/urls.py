@@ -0,0 +1,54 @@
+from django.urls import path
+
+from .resources import (
+    LabelResource,
+    StatusResource,
+    TaskResource,
+    UserResource,
+)
+from .views import ResourceDetailView, ResourceListView
+
+urlpatterns = [
+    path(
+        'tasks/',
+        ResourceListView.as_view(resource_class=TaskResource),
+        name='api_task_list'
+    ),
+    path(
+        'tasks/<int:pk>/',
+        ResourceDetailView.as_view(resource_class=TaskResource),
+        name='api_task_detail'
+    ),
+    path(
+        'statuses/',
+        ResourceListView.as_view(resource_class=StatusResource),
+        name='api_status_list'
+    ),
+    path(
+        'statuses/<int:pk>/',
+        ResourceDetailView.as_view(resource_class=StatusResource),
+        name='api_status_detail'
+    ),
+    path(
+        'labels/',
+        ResourceListView.as_view(resource_class=LabelResource),
+        name='api_label_list'
+    ),
+    path(
+        'labels/<int:pk>/',
+        ResourceDetailView.as_view(resource_class=LabelResource),
+        name='api_label_detail'
+    ),
+    path(
+        'users/',
+        ResourceListView.as_view(
+            resource_class=UserResource, anonymous_methods=('get', 'post')
+        ),
+        name='api_user_list'
+    ),
+    path(
+        'users/<int:pk>/',
+        ResourceDetailView.as_view(resource_class=UserResource),
+        name='api_user_detail'
+    ),
+]
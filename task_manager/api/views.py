@@ -0,0 +1,155 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import ProtectedError
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext as _
+from django.views import View
+
+from task_manager.api.resources import ApiError
+from task_manager.utils import KeysetPaginator
+
+
+class ResourceView(View):
+    resource_class = None
+    anonymous_methods = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        self.resource = self.resource_class(request)
+        try:
+            if not request.user.is_authenticated and (
+                request.method.lower() not in self.anonymous_methods
+            ):
+                raise ApiError(401, _("You are not logged in! Please log in."))
+            return super().dispatch(request, *args, **kwargs)
+        except Http404 as error:
+            return JsonResponse({'error': str(error)}, status=404)
+        except ApiError as error:
+            return JsonResponse(
+                {'error': error.message, 'details': error.details},
+                status=error.status
+            )
+
+    def get_payload(self):
+        try:
+            payload = json.loads(self.request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, _("Request body must be JSON."))
+        if not isinstance(payload, dict):
+            raise ApiError(400, _("Request body must be a JSON object."))
+        return payload
+
+    def get_rows(self, queryset, names):
+        ordering = [name.lstrip('-') for name in self.resource.ordering]
+        columns = self.resource.get_columns(names)
+        return queryset.values(*columns, *[
+            name for name in ordering if name not in columns
+        ])
+
+    def save_form(self, form):
+        if not form.is_valid():
+            raise ApiError(
+                400, _("Invalid data."), {
+                    field: [str(message) for message in messages]
+                    for field, messages in form.errors.items()
+                }
+            )
+        return self.resource.save(form)
+
+    def render_object(self, pk, status=200):
+        names = self.resource.get_field_names()
+        rows = self.get_rows(
+            self.resource.get_queryset().filter(pk=pk), names
+        )
+        data = self.resource.serialize(list(rows), names)
+        if not data:
+            raise Http404(_("Not found."))
+        return self.render({'data': data[0]}, data, status)
+
+    def render(self, content, data, status=200):
+        included = self.resource.get_included(data)
+        if included is not None:
+            content['included'] = included
+        return JsonResponse(content, status=status)
+
+
+class ResourceListView(ResourceView):
+    paginate_by = 100
+    max_paginate_by = 1000
+
+    def get_paginate_by(self):
+        try:
+            per_page = int(self.request.GET['per_page'])
+        except (KeyError, ValueError):
+            return self.paginate_by
+        return min(max(per_page, 1), self.max_paginate_by)
+
+    def get(self, request, *args, **kwargs):
+        names = self.resource.get_field_names()
+        queryset = self.resource.filter_queryset(
+            self.resource.get_queryset()
+        )
+        paginator = KeysetPaginator(
+            self.get_rows(queryset, names), self.get_paginate_by(),
+            ordering=self.resource.ordering
+        )
+        page = paginator.page(request.GET.get('cursor'))
+        data = self.resource.serialize(page.object_list, names)
+        return self.render({
+            'data': data,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }, data)
+
+    def post(self, request, *args, **kwargs):
+        form = self.resource.form_class(
+            data=self.resource.get_form_data(self.get_payload())
+        )
+        obj = self.save_form(form)
+        return self.render_object(obj.pk, status=201)
+
+
+class ResourceDetailView(ResourceView):
+
+    def get_object(self):
+        return get_object_or_404(
+            self.resource.get_queryset(), pk=self.kwargs['pk']
+        )
+
+    def get(self, request, *args, **kwargs):
+        return self.render_object(self.kwargs['pk'])
+
+    def patch(self, request, *args, **kwargs):
+        obj = self.get_object()
+        self.resource.check_change(obj)
+        payload = self.get_payload()
+        form = self.resource.form_class(
+            data=self.resource.get_form_data(payload, obj), instance=obj
+        )
+        return self.render_object(self.update(form, payload).pk)
+
+    def put(self, request, *args, **kwargs):
+        obj = self.get_object()
+        self.resource.check_change(obj)
+        payload = self.get_payload()
+        form = self.resource.form_class(
+            data=self.resource.get_form_data(payload), instance=obj
+        )
+        return self.render_object(self.update(form, payload).pk)
+
+    def update(self, form, payload):
+        # An invalid form rolls the version back.
+        with transaction.atomic():
+            self.resource.swap_version(form.instance, payload.get('version'))
+            return self.save_form(form)
+
+    def delete(self, request, *args, **kwargs):
+        obj = self.get_object()
+        self.resource.check_delete(obj)
+        try:
+            obj.delete()
+        except (ValidationError, ProtectedError):
+            raise ApiError(409, _("Cannot delete an object that is in use."))
+        return HttpResponse(status=204)
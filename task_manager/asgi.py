@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
 
 application = get_asgi_application()
+
+# uvicorn has no worker boot hook, every worker imports this module once.
+from task_manager.warmup import warm_up_templates  # noqa: E402
+
+warm_up_templates()
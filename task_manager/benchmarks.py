@@ -0,0 +1,394 @@
+import os
+import random
+import socket
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest.mock import patch
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models.functions import Length
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from task_manager.label.models import Label
+from task_manager.status.models import Status
+from task_manager.task import counters, fragments
+from task_manager.task.models import Task
+from task_manager.user.models import User
+
+ViewBudget = namedtuple('ViewBudget', ['queries', 'method'], defaults=['get'])
+
+# Maximum number of queries per request, session and user lookups included.
+# Every named URL outside of the admin must have an entry here.
+VIEW_BUDGETS = {
+    'index': ViewBudget(4),
+    'login': ViewBudget(2),
+    'logout': ViewBudget(4, 'post'),
+    'user_index': ViewBudget(3),
+    'user_create': ViewBudget(2),
+    'user_update': ViewBudget(3),
+    'user_delete': ViewBudget(3),
+    'status_index': ViewBudget(3),
+    'status_create': ViewBudget(2),
+    'status_update': ViewBudget(3),
+    'status_delete': ViewBudget(3),
+    'label_index': ViewBudget(3),
+    'label_create': ViewBudget(2),
+    'label_update': ViewBudget(3),
+    'label_delete': ViewBudget(3),
+    'task_index': ViewBudget(4),
+    'task_create': ViewBudget(2),
+    'task_page': ViewBudget(5),
+    'task_history': ViewBudget(3),
+    'task_update': ViewBudget(4),
+    'task_delete': ViewBudget(3),
+    'task_bulk': ViewBudget(3),
+    'task_export': ViewBudget(4),
+    'task_import': ViewBudget(2),
+    'api_task_list': ViewBudget(4),
+    'api_task_detail': ViewBudget(4),
+    'api_status_list': ViewBudget(3),
+    'api_status_detail': ViewBudget(3),
+    'api_label_list': ViewBudget(3),
+    'api_label_detail': ViewBudget(3),
+    'api_user_list': ViewBudget(3),
+    'api_user_detail': ViewBudget(3),
+}
+
+Measurement = namedtuple('Measurement', [
+    'name', 'url', 'status_code', 'queries', 'db_time', 'render_time',
+    'total_time', 'budget'
+])
+
+
+FlowStep = namedtuple('FlowStep', ['name', 'status_code', 'queries'])
+
+
+def iter_url_names(patterns=None, namespace=None):
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace != 'admin':
+                yield from iter_url_names(pattern.url_patterns, namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name, 'pk' in pattern.pattern.converters
+
+
+class RenderTimer:
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.depth = 0
+
+    def __enter__(self):
+        render = Template.render
+        timer = self
+
+        def timed_render(template, context):
+            timer.depth += 1
+            start = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                timer.depth -= 1
+                if not timer.depth:
+                    timer.elapsed += time.perf_counter() - start
+
+        self.patcher = patch.object(Template, 'render', timed_render)
+        self.patcher.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.patcher.stop()
+
+
+def measure(client, name, pk=None):
+    budget = VIEW_BUDGETS.get(name)
+    method = budget.method if budget else 'get'
+    url = reverse(name, kwargs={'pk': pk} if pk is not None else None)
+    start = time.perf_counter()
+    with CaptureQueriesContext(connection) as queries, RenderTimer() as timer:
+        response = getattr(client, method)(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    total_time = time.perf_counter() - start
+    return Measurement(
+        name=name,
+        url=url,
+        status_code=response.status_code,
+        queries=len(queries),
+        db_time=sum(float(query['time']) for query in queries),
+        render_time=timer.elapsed,
+        total_time=total_time,
+        budget=budget.queries if budget else None,
+    )
+
+
+def measure_all(client, user, pk=1, warm_up=True):
+    for name, needs_pk in iter_url_names():
+        object_pk = (
+            (user.pk if name.startswith('user_') else pk)
+            if needs_pk else None
+        )
+        if warm_up:
+            # Steady state numbers: the first request fills the caches.
+            client.force_login(user)
+            measure(client, name, object_pk)
+        client.force_login(user)
+        yield measure(client, name, object_pk)
+
+
+def over_budget(measurements):
+    return [
+        m for m in measurements
+        if m.budget is None or m.queries > m.budget
+    ]
+
+
+def _ensure_rows(model, field, values, **defaults):
+    model.objects.bulk_create(
+        [model(**{field: value}, **defaults) for value in values],
+        ignore_conflicts=True
+    )
+    return list(
+        model.objects.filter(**{f'{field}__in': values})
+        .values_list('pk', flat=True)
+    )
+
+
+def _next_task_number(prefix):
+    # Numbered after the highest existing name, deleted or archived tasks
+    # leave gaps that a count would run into.
+    names = Task.objects.filter(
+        name__regex=rf'^{prefix}[0-9]+$'
+    ).order_by(Length('name').desc(), '-name').values_list('name', flat=True)
+    last = names.first()
+    return int(last.removeprefix(prefix)) + 1 if last else 0
+
+
+def generate_tasks(
+    count, batch_size=1000, users=20, statuses=5, labels=20, seed=0,
+    progress=None
+):
+    rng = random.Random(seed)
+    user_ids = _ensure_rows(
+        User, 'username', [f'bench_user{i}' for i in range(users)],
+        first_name='Bench', last_name='User',
+        password=make_password(None)
+    )
+    status_ids = _ensure_rows(
+        Status, 'name', [f'bench_status{i}' for i in range(statuses)]
+    )
+    label_ids = _ensure_rows(
+        Label, 'name', [f'bench_label{i}' for i in range(labels)]
+    )
+    offset = _next_task_number('bench_task')
+    now = timezone.now()
+    through = Task.labels.through
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create([
+                Task(
+                    name=f'bench_task{offset + start + i}',
+                    description=f'Synthetic task number {start + i}',
+                    status_id=rng.choice(status_ids),
+                    creator_id=rng.choice(user_ids),
+                    executor_id=rng.choice(user_ids + [None]),
+                    created_at=now - timedelta(
+                        seconds=rng.randrange(365 * 24 * 3600)
+                    ),
+                )
+                for i in range(size)
+            ])
+            through.objects.bulk_create([
+                through(task_id=task.pk, label_id=label_id)
+                for task in tasks
+                for label_id in rng.sample(label_ids, rng.randint(0, 3))
+            ])
+            counters.add_tasks([task.pk for task in tasks])
+        if progress:
+            progress(start + size)
+    fragments.bump(Task, [])
+    return count
+
+
+def get_session_flow(username, password, task):
+    update_url = reverse('task_update', kwargs={'pk': task.pk})
+    return [
+        ('login page', 'get', reverse('login'), None),
+        ('log in', 'post', reverse('login'), {
+            'username': username, 'password': password,
+        }),
+        ('task list', 'get', reverse('task_index'), None),
+        ('task form', 'get', update_url, None),
+        ('update task', 'post', update_url, {
+            'name': task.name,
+            'description': task.description or '',
+            'status': task.status_id,
+            'executor': task.executor_id or '',
+            'labels': [label.pk for label in task.labels.all()],
+            'version': task.version,
+        }),
+        ('task list', 'get', reverse('task_index'), None),
+    ]
+
+
+def measure_session_flow(profile, steps, host='testserver'):
+    with override_settings(**settings.SESSION_PROFILES[profile]):
+        client = Client(HTTP_HOST=host)
+        for name, method, url, data in steps:
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(url, data)
+            yield FlowStep(name, response.status_code, len(queries))
+
+
+def compare_session_profiles(
+    username, password, task, profiles=None, warm_up=True,
+    host='testserver'
+):
+    # Every flow is rolled back, so each profile starts from the same data.
+    steps = get_session_flow(username, password, task)
+    results = {}
+    for profile in profiles or settings.SESSION_PROFILES:
+        for run in range(2 if warm_up else 1):
+            with transaction.atomic():
+                results[profile] = list(
+                    measure_session_flow(profile, steps, host)
+                )
+                transaction.set_rollback(True)
+    return results
+
+
+# Both modes run the same number of worker processes, the ASGI one serves
+# the async variants of the read views.
+SERVERS = {
+    'wsgi': {
+        'command': [
+            'gunicorn', 'task_manager.wsgi:application',
+            '--config', 'gunicorn.conf.py', '--workers', '{workers}',
+            '--bind', '127.0.0.1:{port}',
+        ],
+        'env': {'ASYNC_VIEWS': 'false'},
+    },
+    'asgi': {
+        'command': [
+            'uvicorn', 'task_manager.asgi:application',
+            '--workers', '{workers}', '--host', '127.0.0.1',
+            '--port', '{port}', '--no-access-log',
+        ],
+        'env': {'ASYNC_VIEWS': 'true'},
+    },
+}
+
+LoadResult = namedtuple('LoadResult', [
+    'mode', 'path', 'requests', 'errors', 'throughput', 'p50', 'p95', 'p99',
+    'max'
+])
+
+
+def get_session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    name = settings.SESSION_COOKIE_NAME
+    return f'{name}={client.cookies[name].value}'
+
+
+def wait_for_port(process, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"Server exited with code {process.returncode}"
+            )
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not listen on port {port}")
+
+
+@contextmanager
+def serve(mode, port, workers, timeout=30):
+    server = SERVERS[mode]
+    command = [
+        part.format(port=port, workers=workers) for part in server['command']
+    ]
+    process = subprocess.Popen(
+        command, env={**os.environ, **server['env']},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(process, port, timeout)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def fetch(url, headers, timeout):
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=timeout) as r:
+            r.read()
+            ok = r.status == 200
+    except OSError:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_load(url, cookie, concurrency, requests, timeout=30):
+    headers = {'Cookie': cookie}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(
+            lambda _: fetch(url, headers, timeout), range(requests)
+        ))
+    elapsed = time.perf_counter() - start
+    return summarize(results, elapsed)
+
+
+def summarize(results, elapsed):
+    latencies = [latency for latency, ok in results]
+    return {
+        'requests': len(results),
+        'errors': sum(1 for latency, ok in results if not ok),
+        'throughput': len(results) / elapsed,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max': max(latencies),
+    }
+
+
+def compare_modes(
+    user, paths, modes=('wsgi', 'asgi'), concurrency=50, requests=500,
+    workers=2, port=8765, warm_up=20
+):
+    cookie = get_session_cookie(user)
+    for mode in modes:
+        with serve(mode, port, workers) as base_url:
+            for path in paths:
+                url = base_url + path
+                run_load(url, cookie, min(concurrency, warm_up), warm_up)
+                yield LoadResult(
+                    mode=mode, path=path,
+                    **run_load(url, cookie, concurrency, requests)
+                )
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_task_count(apps, schema_editor):
+    Label = apps.get_model('label', 'Label')
+    TaskLabel = apps.get_model('task', 'TaskLabel')
+    Label.objects.update(task_count=Coalesce(Subquery(
+        TaskLabel.objects.filter(label=OuterRef('pk')).values(
+            'label'
+        ).annotate(total=Count('*')).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('label', '0001_initial'),
+        ('task', '0007_task_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='label',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_task_count, migrations.RunPython.noop),
+    ]
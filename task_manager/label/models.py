@@ -12,16 +12,16 @@ class Label(models.Model):
         }
     )
     created_at = models.DateTimeField(default=timezone.now)
+    # Maintained by task.counters together with the per status counts.
+    task_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
     def delete(self, *args, **kwargs):
-        # Если убрать этот блок, тогда можно будет удалить Label, когда он
-        # привязан к Task, тесты это подтверждают. Для ManyToManyField же нельзя
-        # использовать on_delete=models.PROTECT, как для других полей? Есть
-        # другой способ запретить удаление в модели Task?
-        if self.task_set.exists():
+        # task_count only saves the delete query in the common case, the
+        # database refuses to delete a label in use through TaskLabel.label.
+        if self.task_count > 0:
             raise ValidationError(
                 "This label cannot be deleted."
             )
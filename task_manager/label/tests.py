@@ -1,12 +1,17 @@
 import json
 from os.path import join
 
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.translation import gettext as _
 
 from task_manager.label.models import Label
 from task_manager.status.models import Status
-from task_manager.task.models import Task
+from task_manager.task import counters
+from task_manager.task.models import Task, TaskLabel
 from task_manager.user.models import User
 from task_manager.utils import BaseTestCase
 
@@ -155,3 +160,114 @@ class TestLebelDelete(BaseTestCase):
             response, 'label_index',
             _("Cannot delete label while it is being used")
         )
+
+    def test_delete_label_in_use_single_fetch(self):
+        self.login_user(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('label_delete', kwargs={'pk': 2}))
+        label_queries = [
+            query['sql'] for query in queries
+            if '"label_label"' in query['sql']
+        ]
+        self.assertEqual(len(label_queries), 1)
+        self.assertFalse(
+            any('task_task_labels' in query['sql'] for query in queries)
+        )
+        self.assertTrue(Label.objects.filter(id=2).exists())
+
+
+class TestLabelUsage(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.task = Task.objects.get(id=1)
+        self.login_user(self.user)
+
+    def assertUsageMatches(self):
+        self.assertEqual(
+            dict(Label.objects.values_list('id', 'task_count')),
+            {
+                label.id: label.task_set.count()
+                for label in Label.objects.all()
+            }
+        )
+
+    def test_index_shows_usage_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('label_index'))
+        label_queries = [q['sql'] for q in queries if 'label' in q['sql']]
+        self.assertEqual(len(label_queries), 1)
+        self.assertNotIn('task_task_labels', label_queries[0])
+        self.assertContains(response, '<td>2</td>', html=True)
+        self.assertContains(
+            response, reverse('label_delete', kwargs={'pk': 1})
+        )
+        self.assertNotContains(
+            response, reverse('label_delete', kwargs={'pk': 2})
+        )
+        self.assertContains(response, _("In use"), count=2)
+
+    def test_usage_follows_task_changes(self):
+        self.assertUsageMatches()
+        self.client.post(reverse('task_create'), {
+            'name': 'labelled', 'status': 1, 'labels': [1, 2]
+        })
+        self.assertUsageMatches()
+        task = Task.objects.get(name='labelled')
+        Label.objects.get(id=3).task_set.add(task)
+        self.assertUsageMatches()
+        task.labels.remove(Label.objects.get(id=1))
+        self.assertUsageMatches()
+        Label.objects.get(id=2).task_set.clear()
+        self.assertUsageMatches()
+        self.client.post(reverse('task_delete', args=[task.id]))
+        self.assertUsageMatches()
+
+    def test_usage_follows_bulk_changes(self):
+        self.client.post(reverse('task_bulk'), {
+            'ids': [1, 2], 'action': 'update', 'add_labels': [1],
+            'remove_labels': [2],
+        })
+        self.assertEqual(Label.objects.get(id=1).task_count, 2)
+        self.assertUsageMatches()
+        self.client.post(reverse('task_bulk'), {
+            'ids': [1, 2], 'action': 'delete',
+        })
+        self.assertUsageMatches()
+
+    def test_rebuild_restores_usage(self):
+        Label.objects.update(task_count=7)
+        counters.rebuild()
+        self.assertUsageMatches()
+
+    def test_fixture_loads_are_counted_by_rebuild(self):
+        TaskLabel.objects.all().delete()
+        counters.rebuild()
+        call_command(
+            'loaddata', 'users.json', 'statuses.json', 'labels.json',
+            'tasks.json', verbosity=0
+        )
+        self.assertEqual(
+            set(Label.objects.values_list('task_count', flat=True)), {0}
+        )
+        counters.rebuild()
+        self.assertEqual(Label.objects.get(id=2).task_count, 2)
+        self.assertUsageMatches()
+
+    def test_delete_uses_counter(self):
+        label = Label.objects.get(id=1)
+        self.task.labels.add(label)
+        label.refresh_from_db()
+        with self.assertNumQueries(0), self.assertRaises(ValidationError):
+            label.delete()
+
+    def test_delete_with_stale_counter_is_refused(self):
+        Label.objects.filter(id=2).update(task_count=0)
+        response = self.client.post(
+            reverse('label_delete', kwargs={'pk': 2}), follow=True
+        )
+        self.assertRedirectWithMessage(
+            response, 'label_index',
+            _("Cannot delete label while it is being used")
+        )
+        self.assertTrue(self.task.labels.filter(id=2).exists())
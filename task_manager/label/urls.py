@@ -1,9 +1,14 @@
 from django.urls import path
 
+from task_manager.utils import select_view
 from . import views
 
 urlpatterns = [
-    path('', views.LabelIndexView.as_view(), name='label_index'),
+    path(
+        '',
+        select_view(views.LabelIndexView, views.AsyncLabelIndexView),
+        name='label_index'
+    ),
     path(
         'create/',
         views.LabelFormCreateView.as_view(),
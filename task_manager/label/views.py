@@ -1,20 +1,32 @@
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db.models import Exists, OuterRef
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
 from task_manager import utils
 from task_manager.label.forms import LabelForm
 from task_manager.label.models import Label
+from task_manager.task.models import ArchivedTaskLabel
 
 
-class LabelIndexView(utils.UserLoginRequiredMixin, ListView):
+class LabelIndexView(
+    utils.UserLoginRequiredMixin, utils.IndexViewMixin, ListView
+):
     model = Label
     template_name = 'pages/index_label.html'
+    context_object_name = 'labels'
+    sort_fields = ('id', 'name')
+
+    def get_queryset(self):
+        # task_count covers the task table only, archived tasks still keep
+        # their labels from being deleted.
+        return super().get_queryset().annotate(archived=Exists(
+            ArchivedTaskLabel.objects.filter(label=OuterRef('pk'))
+        ))
+
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['labels'] = Label.objects.all()
-        return context
+class AsyncLabelIndexView(utils.AsyncIndexViewMixin, LabelIndexView):
+    pass
 
 
 class LabelFormCreateView(
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.benchmarks import compare_session_profiles
+from task_manager.task.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the queries of the login, task list and task update flow "
+        "with every session profile"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--pk', type=int, default=1)
+        parser.add_argument('--host', default='127.0.0.1')
+
+    def handle(self, *args, **options):
+        try:
+            task = Task.objects.get(pk=options['pk'])
+        except Task.DoesNotExist:
+            raise CommandError(f"Task {options['pk']} does not exist")
+        results = compare_session_profiles(
+            options['username'], options['password'], task,
+            host=options['host']
+        )
+        for profile, steps in results.items():
+            failed = [step.name for step in steps if step.status_code >= 400]
+            if failed or steps[2].status_code != 200:
+                raise CommandError(
+                    f"{profile}: the flow failed, check the credentials"
+                )
+        profiles = list(results)
+        self.stdout.write(
+            f"{'step':<14}" + ''.join(f'{name:>16}' for name in profiles)
+        )
+        for i, step in enumerate(results[profiles[0]]):
+            self.stdout.write(f'{step.name:<14}' + ''.join(
+                f'{results[name][i].queries:>16}' for name in profiles
+            ))
+        totals = {
+            name: sum(step.queries for step in steps)
+            for name, steps in results.items()
+        }
+        self.stdout.write(f"{'total':<14}" + ''.join(
+            f'{totals[name]:>16}' for name in profiles
+        ))
+        self.stdout.write(f"{'saved':<14}" + ''.join(
+            f"{totals[profiles[0]] - totals[name]:>16}" for name in profiles
+        ))
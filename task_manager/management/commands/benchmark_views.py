@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from task_manager.benchmarks import measure_all, over_budget
+from task_manager.user.models import User
+
+
+class Command(BaseCommand):
+    help = "Measure queries, DB time and render time of every view"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--pk', type=int, default=1)
+        parser.add_argument('--host', default='127.0.0.1')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+        client = Client(HTTP_HOST=options['host'])
+        measurements = list(measure_all(client, user, options['pk']))
+        self.stdout.write(
+            f"{'view':<16}{'status':>7}{'queries':>9}{'budget':>8}"
+            f"{'db ms':>9}{'render ms':>11}{'total ms':>10}"
+        )
+        for m in measurements:
+            self.stdout.write(
+                f"{m.name:<16}{m.status_code:>7}{m.queries:>9}"
+                f"{m.budget if m.budget is not None else '-':>8}"
+                f"{m.db_time * 1000:>9.1f}{m.render_time * 1000:>11.1f}"
+                f"{m.total_time * 1000:>10.1f}"
+            )
+        failed = over_budget(measurements)
+        if failed:
+            raise CommandError(
+                "Over query budget: " + ', '.join(m.name for m in failed)
+            )
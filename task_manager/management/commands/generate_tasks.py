@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from task_manager.benchmarks import generate_tasks
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, statuses, labels and tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--statuses', type=int, default=5)
+        parser.add_argument('--labels', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        generate_tasks(
+            options['count'],
+            batch_size=options['batch_size'],
+            users=options['users'],
+            statuses=options['statuses'],
+            labels=options['labels'],
+            seed=options['seed'],
+            progress=lambda done: self.stdout.write(f"{done} tasks created"),
+        )
+        self.stdout.write(self.style.SUCCESS("Done"))
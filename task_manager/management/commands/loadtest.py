@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.benchmarks import SERVERS, compare_modes
+from task_manager.user.models import User
+
+DEFAULT_PATHS = ['/tasks/', '/statuses/', '/labels/', '/users/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the WSGI and the ASGI server in turn and compare throughput "
+        "and tail latency of the read views under concurrent load"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True)
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help="Path to load, can be repeated"
+        )
+        parser.add_argument(
+            '--mode', action='append', dest='modes', choices=list(SERVERS)
+        )
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+        results = compare_modes(
+            user, options['paths'] or DEFAULT_PATHS,
+            modes=options['modes'] or list(SERVERS),
+            concurrency=options['concurrency'],
+            requests=options['requests'],
+            workers=options['workers'],
+            port=options['port'],
+        )
+        self.stdout.write(
+            f"{'mode':<6}{'path':<14}{'requests':>9}{'errors':>8}"
+            f"{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'max ms':>9}"
+        )
+        try:
+            for r in results:
+                self.stdout.write(
+                    f"{r.mode:<6}{r.path:<14}{r.requests:>9}{r.errors:>8}"
+                    f"{r.throughput:>9.1f}{r.p50 * 1000:>9.1f}"
+                    f"{r.p95 * 1000:>9.1f}{r.p99 * 1000:>9.1f}"
+                    f"{r.max * 1000:>9.1f}"
+                )
+        except (OSError, RuntimeError) as error:
+            raise CommandError(str(error))
@@ -0,0 +1,181 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    max_sql_length = 500
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.end = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.render_time = 0.0
+        self.render_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+    def render(self, render, template, context):
+        # Included templates are rendered inside their parent, only the
+        # outermost render is counted.
+        self.render_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            self.render_depth -= 1
+            if not self.render_depth:
+                self.render_time += time.perf_counter() - start
+
+    def get_timings(self):
+        end = self.end or time.perf_counter()
+        return {
+            'db': self.db_time,
+            'db-slowest': self.slowest_time,
+            'render': self.render_time,
+            'view': end - self.view_start if self.view_start else 0.0,
+            'total': end - self.start,
+        }
+
+    def server_timing(self):
+        return ', '.join(
+            f'{name};dur={seconds * 1000:.2f}'
+            + (f';desc="{self.queries} queries"' if name == 'db' else '')
+            for name, seconds in self.get_timings().items()
+        )
+
+    def as_dict(self, request, response):
+        match = request.resolver_match
+        data = {
+            'url_name': match.url_name if match else None,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': self.queries,
+        }
+        data.update({
+            f"{name.replace('-', '_')}_ms": round(seconds * 1000, 2)
+            for name, seconds in self.get_timings().items()
+        })
+        data['slowest_sql'] = (
+            self.slowest_sql[:self.max_sql_length]
+            if self.slowest_sql else None
+        )
+        return data
+
+
+def install_render_timer():
+    render = Template.render
+    if getattr(render, 'timed', False):
+        return
+
+    @wraps(render)
+    def timed_render(template, context):
+        metrics = _current.get()
+        if metrics is None:
+            return render(template, context)
+        return metrics.render(render, template, context)
+
+    timed_render.timed = True
+    Template.render = timed_render
+
+
+class PerformanceMiddleware:
+    # Measures a PERFORMANCE_SAMPLE_RATE share of the requests. With the
+    # rate at 0 the middleware isn't loaded at all.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.PERFORMANCE_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = settings.PERFORMANCE_SERVER_TIMING
+        install_render_timer()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        metrics, token = self.start(request)
+        try:
+            with self.wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        metrics, token = self.start(request)
+        try:
+            # Connections belong to threads, the wrappers go on those of the
+            # thread that runs the request's sync code and async queries.
+            stack = await sync_to_async(self.wrap_connections)(metrics)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics)
+
+    def start(self, request):
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        return metrics, _current.set(metrics)
+
+    def wrap_connections(self, metrics):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(metrics))
+        return stack
+
+    def report(self, request, response, metrics):
+        metrics.end = time.perf_counter()
+        if self.server_timing:
+            response['Server-Timing'] = metrics.server_timing()
+        record = metrics.as_dict(request, response)
+        logger.info(json.dumps(record), extra={'performance': record})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            metrics.view_start = time.perf_counter()
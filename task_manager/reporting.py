@@ -0,0 +1,233 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, namedtuple
+from functools import cache
+
+import rollbar
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.http import Http404
+from django.utils.deprecation import MiddlewareMixin
+from rollbar.contrib.django.middleware import (
+    RollbarNotifierMiddleware,
+    _apply_sensitive_post_params,
+    _should_ignore_404,
+)
+
+logger = logging.getLogger(__name__)
+
+Report = namedtuple('Report', [
+    'exc_info', 'request', 'extra_data', 'payload_data', 'level', 'message'
+], defaults=[None, None, None, None, 'error', None])
+
+
+class RollbarSink:
+
+    def send(self, reports):
+        for report in reports:
+            if report.exc_info is None:
+                rollbar.report_message(
+                    report.message, report.level, report.request
+                )
+                continue
+            if report.request is not None:
+                _apply_sensitive_post_params(report.request)
+            rollbar.report_exc_info(
+                report.exc_info, report.request,
+                extra_data=report.extra_data,
+                payload_data=report.payload_data,
+            )
+
+
+class FileSink:
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, reports):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            for report in reports:
+                file.write(json.dumps(self.to_dict(report)) + '\n')
+
+    @staticmethod
+    def to_dict(report):
+        data = {'level': report.level, 'message': report.message}
+        if report.request is not None:
+            data['path'] = report.request.get_full_path()
+            data['method'] = report.request.method
+        if report.exc_info is not None:
+            cls, exc, trace = report.exc_info
+            data['message'] = f'{cls.__name__}: {exc}'
+            data['traceback'] = ''.join(
+                traceback.format_exception(cls, exc, trace)
+            )
+        return data
+
+
+class MemorySink:
+
+    def __init__(self):
+        self.batches = []
+
+    def send(self, reports):
+        self.batches.append(list(reports))
+
+    @property
+    def reports(self):
+        return [report for batch in self.batches for report in batch]
+
+
+class ReportQueue:
+    # The request thread only appends to a bounded queue. Building and
+    # sending the payload happens in one background thread per process,
+    # which takes up to batch_size reports per wake-up. When the queue is
+    # full new reports are dropped and counted, and the number of dropped
+    # reports is sent along with the next batch.
+
+    def __init__(
+        self, sink, maxsize=1000, batch_size=50, flush_interval=1.0,
+        exit_timeout=5
+    ):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.exit_timeout = exit_timeout
+        self.counts = Counter()
+        self.reported_drops = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+
+    def put(self, report):
+        self.ensure_worker()
+        try:
+            self.queue.put_nowait(report)
+        except queue.Full:
+            with self.lock:
+                self.counts['dropped'] += 1
+            return False
+        return True
+
+    def ensure_worker(self):
+        # A forked worker inherits the queue but not the thread.
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.thread = threading.Thread(
+                    target=self.run, name='report-queue', daemon=True
+                )
+                self.thread.start()
+                self.pid = os.getpid()
+                atexit.register(self.flush, self.exit_timeout)
+
+    def run(self):
+        while True:
+            self.process(self.get_batch())
+
+    def get_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(
+                    timeout=max(deadline - time.monotonic(), 0)
+                ))
+            except queue.Empty:
+                break
+        return batch
+
+    def process(self, batch):
+        reports = list(batch)
+        with self.lock:
+            dropped = self.counts['dropped'] - self.reported_drops
+            self.reported_drops += dropped
+        if dropped:
+            reports.append(Report(
+                level='warning',
+                message=f'{dropped} error reports dropped, queue is full',
+            ))
+        try:
+            self.sink.send(reports)
+            outcome = 'sent'
+        except Exception:
+            logger.exception("Could not send %s error reports", len(batch))
+            outcome = 'failed'
+        with self.lock:
+            self.counts[outcome] += len(batch)
+        # Only this thread's connections, opened by a lazy request.user.
+        connections.close_all()
+        for _ in batch:
+            self.queue.task_done()
+
+    def flush(self, timeout=None):
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(
+                lambda: not self.queue.unfinished_tasks, timeout
+            )
+
+    def stats(self):
+        with self.lock:
+            return {
+                'queued': self.queue.qsize(),
+                'sent': self.counts['sent'],
+                'failed': self.counts['failed'],
+                'dropped': self.counts['dropped'],
+            }
+
+
+SINKS = {
+    'rollbar': RollbarSink,
+    'file': lambda: FileSink(settings.ERROR_REPORT_FILE),
+    'memory': MemorySink,
+}
+
+
+@cache
+def get_report_queue():
+    return ReportQueue(
+        SINKS[settings.ERROR_REPORT_SINK](),
+        maxsize=settings.ERROR_REPORT_QUEUE_SIZE,
+        batch_size=settings.ERROR_REPORT_BATCH_SIZE,
+        flush_interval=settings.ERROR_REPORT_FLUSH_INTERVAL,
+    )
+
+
+def reset_report_queue(setting, **kwargs):
+    if setting.startswith('ERROR_REPORT_'):
+        get_report_queue.cache_clear()
+
+
+setting_changed.connect(reset_report_queue)
+
+
+class ReportingMiddleware(RollbarNotifierMiddleware):
+    # RollbarNotifierMiddleware builds and sends the payload inside the
+    # request. Here the request only enqueues the exception.
+
+    def __init__(self, get_response=None):
+        if settings.ERROR_REPORT_SINK == 'rollbar':
+            super().__init__(get_response)
+        else:
+            MiddlewareMixin.__init__(self, get_response)
+        self.reports = get_report_queue()
+
+    def process_exception(self, request, exc):
+        if isinstance(exc, Http404) and (
+            _should_ignore_404(request.get_full_path())
+        ):
+            return
+        self.reports.put(Report(
+            sys.exc_info(), request,
+            extra_data=self.get_extra_data(request, exc),
+            payload_data=self.get_payload_data(request, exc),
+        ))
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 import dj_database_url
@@ -58,14 +59,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'task_manager.performance.PerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'task_manager.task.history.HistoryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'rollbar.contrib.django.middleware.RollbarNotifierMiddleware',
+    'task_manager.reporting.ReportingMiddleware',
 ]
 
 ROOT_URLCONF = 'task_manager.urls'
@@ -75,14 +78,62 @@ ROLLBAR = {
     'environment': 'development' if DEBUG else 'production',
     'branch': 'master',
     'root': BASE_DIR,
+    # Reports are sent from the background thread of ReportQueue.
+    'handler': 'blocking',
 }
 
+# Share of requests measured by PerformanceMiddleware, from 0 (off, the
+# middleware isn't loaded) to 1. Measured requests get a Server-Timing
+# header and a JSON line in the task_manager.performance log.
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', 0))
+PERFORMANCE_SERVER_TIMING = (
+    os.getenv('PERFORMANCE_SERVER_TIMING', 'true').lower() == 'true'
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'task_manager.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Where ReportingMiddleware sends exceptions: 'rollbar', 'file' (JSON lines
+# in ERROR_REPORT_FILE) or 'memory'. Reports that don't fit in the queue
+# are dropped and counted.
+ERROR_REPORT_SINK = os.getenv('ERROR_REPORT_SINK', 'rollbar')
+ERROR_REPORT_FILE = os.getenv(
+    'ERROR_REPORT_FILE', BASE_DIR / 'error_reports.jsonl'
+)
+ERROR_REPORT_QUEUE_SIZE = int(os.getenv('ERROR_REPORT_QUEUE_SIZE', 1000))
+ERROR_REPORT_BATCH_SIZE = int(os.getenv('ERROR_REPORT_BATCH_SIZE', 50))
+ERROR_REPORT_FLUSH_INTERVAL = float(
+    os.getenv('ERROR_REPORT_FLUSH_INTERVAL', 1.0)
+)
+
+# Templates are only looked up in the apps' templates directories. Outside
+# of DEBUG the cached loader keeps every compiled template for the lifetime
+# of the worker, and gunicorn.conf.py fills it when the worker boots.
+TEMPLATE_LOADERS = ['django.template.loaders.app_directories.Loader']
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+TEMPLATE_WARMUP_APPS = ['task_manager', 'crispy_bootstrap5', 'django_bootstrap5']
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
+        'DIRS': [],
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -94,6 +145,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'task_manager.wsgi.application'
+ASGI_APPLICATION = 'task_manager.asgi.application'
+
+# Serve the read-only index and task pages with async views. Meant for the
+# ASGI server (make start-asgi), under WSGI every async view is run in its
+# own event loop.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'false').lower() == 'true'
 
 CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
@@ -113,6 +170,64 @@ DATABASES = {
     )
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# With several workers point CACHE_BACKEND/CACHE_LOCATION at a shared cache
+# (Redis, Memcached), otherwise every worker invalidates only its own copy.
+
+# The fragment versions and cached choices are invalidated by writing to
+# the cache, so every process has to share it: a local-memory cache would
+# keep serving old rows in every worker but the one that made the change.
+# The file cache is shared by the workers of one host, several hosts need
+# memcached or redis.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'task_manager_cache')
+        ),
+        # One version key and one fragment per task row, Django's default
+        # of 300 entries would be culled after a few list pages.
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 20000)),
+        },
+    },
+    # Only used by the cached_db session profile. A local-memory cache is
+    # only safe with a single worker: a logout evicts the session from the
+    # cache of the worker that served it and no other.
+    'sessions': {
+        'BACKEND': os.getenv(
+            'SESSION_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'SESSION_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'task_manager_sessions')
+        ),
+    },
+}
+
+CHOICES_CACHE_TIMEOUT = int(os.getenv('CHOICES_CACHE_TIMEOUT', 300))
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', 3600))
+
+# Task history older than this is removed by the prune_task_history command.
+TASK_HISTORY_RETENTION_DAYS = int(
+    os.getenv('TASK_HISTORY_RETENTION_DAYS', 365)
+)
+
+# The archive_tasks command moves tasks in these statuses (comma separated
+# names) that haven't changed for TASK_ARCHIVE_AFTER_DAYS to the archive.
+TASK_ARCHIVE_STATUSES = [
+    name.strip()
+    for name in os.getenv('TASK_ARCHIVE_STATUSES', '').split(',')
+    if name.strip()
+]
+TASK_ARCHIVE_AFTER_DAYS = int(os.getenv('TASK_ARCHIVE_AFTER_DAYS', 90))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -128,6 +243,32 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = 'user.User'
 
+# Sessions and flash messages
+# https://docs.djangoproject.com/en/5.1/topics/http/sessions/
+# db reads the session row on every authenticated request. cached_db reads
+# it from the 'sessions' cache and only writes through to the database.
+# signed_cookies needs no storage at all, but a cookie stays valid until it
+# expires, even after logout. Messages go to a cookie in both of them.
+
+SESSION_PROFILES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.fallback.FallbackStorage',
+    },
+    'cached_db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.cookie.CookieStorage',
+    },
+    'signed_cookies': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies',
+        'MESSAGE_STORAGE': 'django.contrib.messages.storage.cookie.CookieStorage',
+    },
+}
+SESSION_PROFILE = os.getenv('SESSION_PROFILE', 'db')
+SESSION_ENGINE = SESSION_PROFILES[SESSION_PROFILE]['SESSION_ENGINE']
+MESSAGE_STORAGE = SESSION_PROFILES[SESSION_PROFILE]['MESSAGE_STORAGE']
+SESSION_CACHE_ALIAS = 'sessions'
+
 LOGIN_URL = '/login/'
 
 # Internationalization
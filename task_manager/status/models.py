@@ -11,6 +11,8 @@ class Status(models.Model):
         }
     )
     created_at = models.DateTimeField(default=timezone.now)
+    # Incremented by every update, see utils.UpdateViewMixin.
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
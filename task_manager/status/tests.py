@@ -25,6 +25,39 @@ class TestStatusRead(BaseTestCase):
         response = self.client.get(reverse('status_index'))
         self.assertEqual(response.status_code, 200)
 
+    def test_read_status_paginated_and_sorted(self):
+        self.login_user(self.user)
+        for name in ('b_status', 'a_status', 'c_status'):
+            Status.objects.create(name=name)
+        expected = list(
+            Status.objects.order_by('-name').values_list('name', flat=True)
+        )
+        params = {'sort': '-name', 'per_page': 2}
+        names = []
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('status_index'), params)
+        while True:
+            page = response.context['page_obj']
+            names += [status.name for status in response.context['statuses']]
+            if not page.has_next():
+                break
+            response = self.client.get(
+                reverse('status_index'), {**params, 'cursor': page.next_cursor}
+            )
+        self.assertEqual(names, expected)
+
+    def test_read_status_limits(self):
+        self.login_user(self.user)
+        response = self.client.get(
+            reverse('status_index'), {'sort': 'created_at', 'per_page': 10000}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [status.id for status in response.context['statuses']],
+            sorted(Status.objects.values_list('id', flat=True))
+        )
+        self.assertEqual(response.context['paginator'].per_page, 200)
+
 
 class TestStatusCreate(BaseTestCase):
 
@@ -101,6 +134,21 @@ class TestStatusUpdate(BaseTestCase):
             response, 'status_index', _("Status is updated successfully")
         )
 
+    def test_stale_update_shows_conflict(self):
+        self.login_user(self.user)
+        url = reverse('status_update', kwargs={'pk': 1})
+        self.client.post(url, self.complete_status_data)
+        response = self.client.post(url, {
+            **self.complete_status_data, 'name': 'stale_status'
+        })
+        self.assertFormError(
+            response.context['form'], 'name',
+            _("Saved value: %(value)s") % {'value': 'new_status'}
+        )
+        self.status.refresh_from_db()
+        self.assertEqual(self.status.name, 'new_status')
+        self.assertEqual(self.status.version, 1)
+
     def test_update_status_missing_field(self):
         self.login_user(self.user)
         response = self.client.post(
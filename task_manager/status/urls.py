@@ -1,9 +1,14 @@
 from django.urls import path
 
+from task_manager.utils import select_view
 from . import views
 
 urlpatterns = [
-    path('', views.StatusIndexView.as_view(), name='status_index'),
+    path(
+        '',
+        select_view(views.StatusIndexView, views.AsyncStatusIndexView),
+        name='status_index'
+    ),
     path(
         'create/',
         views.StatusFormCreateView.as_view(),
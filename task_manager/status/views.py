@@ -7,14 +7,17 @@ from task_manager.status.forms import StatusForm
 from task_manager.status.models import Status
 
 
-class StatusIndexView(utils.UserLoginRequiredMixin, ListView):
+class StatusIndexView(
+    utils.UserLoginRequiredMixin, utils.IndexViewMixin, ListView
+):
     model = Status
     template_name = 'pages/index_status.html'
+    context_object_name = 'statuses'
+    sort_fields = ('id', 'name')
+
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['statuses'] = Status.objects.all()
-        return context
+class AsyncStatusIndexView(utils.AsyncIndexViewMixin, StatusIndexView):
+    pass
 
 
 class StatusFormCreateView(
@@ -38,3 +41,4 @@ class StatusFormDeleteView(
     SuccessMessageMixin, DeleteView
 ):
     model = Status
+    in_use_relations = ('task', 'archived_tasks')
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class TaskConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task_manager.task'
+
+    def ready(self):
+        from task_manager.task import choices, counters, fragments, history
+        choices.connect_signals()
+        counters.connect_signals()
+        fragments.connect_signals()
+        history.connect_signals()
@@ -0,0 +1,53 @@
+from django.db import transaction
+
+from task_manager.task import counters, history
+from task_manager.task.models import (
+    ArchivedTask,
+    ArchivedTaskLabel,
+    Task,
+    TaskLabel,
+)
+
+COLUMNS = (
+    'id', 'name', 'description', 'status_id', 'creator_id', 'executor_id',
+    'created_at', 'updated_at',
+)
+
+
+def get_archivable(status_ids, before):
+    return Task.objects.filter(
+        status_id__in=status_ids, updated_at__lt=before
+    )
+
+
+def archive_tasks(status_ids, before, batch_size=500):
+    # Every batch is a transaction of its own, so the hot table is never
+    # locked for long and an interrupted run keeps the finished batches.
+    archived = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                get_archivable(status_ids, before).select_for_update()
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return archived
+            archive_batch(ids)
+        archived += len(ids)
+
+
+def archive_batch(ids):
+    ArchivedTask.objects.bulk_create([
+        ArchivedTask(**row)
+        for row in Task.objects.filter(id__in=ids).values(*COLUMNS)
+    ])
+    ArchivedTaskLabel.objects.bulk_create([
+        ArchivedTaskLabel(task_id=task_id, label_id=label_id)
+        for task_id, label_id in TaskLabel.objects.filter(
+            task_id__in=ids
+        ).values_list('task_id', 'label_id')
+    ])
+    # The delete signals drop the tasks' cached fragments, the counters
+    # are moved in one go and the history isn't told about a deletion.
+    with counters.track(ids), history.paused():
+        Task.objects.filter(id__in=ids).delete()
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from task_manager.task import counters, fragments, history
+from task_manager.task.models import Task, TaskLabel
+
+UPDATE = 'update'
+DELETE = 'delete'
+
+
+class BulkResult:
+
+    def __init__(self):
+        self.done = []
+        self.failures = []
+
+    def fail(self, task_id, message):
+        self.failures.append((task_id, message))
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def chunked_queryset(queryset, size):
+    # Keyset batches along the primary key, a filter matching most of the
+    # table never has all of its ids in memory.
+    queryset = queryset.order_by('id').values_list('id', flat=True)
+    last = None
+    while True:
+        rows = queryset if last is None else queryset.filter(id__gt=last)
+        chunk = list(rows[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def get_chunks(ids, size):
+    if isinstance(ids, QuerySet):
+        return chunked_queryset(ids, size)
+    return chunked(sorted(set(ids)), size)
+
+
+def run_bulk(
+    user, ids, action, status=None, executor=None,
+    add_labels=(), remove_labels=(), batch_size=500
+):
+    result = BulkResult()
+    with transaction.atomic(), history.recording(user):
+        for chunk in get_chunks(ids, batch_size):
+            found = {
+                row['id']: row for row in
+                Task.objects.select_for_update().filter(id__in=chunk).values(
+                    'id', 'creator_id', *history.TRACKED_FIELDS
+                )
+            }
+            for task_id in chunk:
+                if task_id not in found:
+                    result.fail(task_id, _("Task does not exist."))
+            with counters.track(list(found)):
+                if action == DELETE:
+                    delete_tasks(result, user, found)
+                else:
+                    update_tasks(
+                        result, found, status, executor,
+                        add_labels, remove_labels
+                    )
+        fragments.bump(Task, result.done)
+    return result
+
+
+def delete_tasks(result, user, found):
+    allowed = []
+    for task_id, row in found.items():
+        if row['creator_id'] == user.id:
+            allowed.append(task_id)
+        else:
+            result.fail(
+                task_id, _("Task can be deleted only by its creator.")
+            )
+    Task.objects.filter(id__in=allowed).delete()
+    result.done += allowed
+
+
+def update_tasks(result, found, status, executor, add_labels,
+                 remove_labels):
+    ids = list(found)
+    changes = {
+        name: value for name, value in
+        (('status', status), ('executor', executor))
+        if value is not None
+    }
+    label_pairs = []
+    if add_labels or remove_labels:
+        label_pairs = list(TaskLabel.objects.filter(
+            task_id__in=ids, label__in=[*add_labels, *remove_labels]
+        ).values_list('task_id', 'label_id'))
+    history.record_bulk_update(
+        found, {f'{name}_id': value.pk for name, value in changes.items()},
+        label_pairs, add_labels, remove_labels
+    )
+    Task.objects.filter(id__in=ids).update(
+        **changes, updated_at=timezone.now(), version=F('version') + 1
+    )
+    if remove_labels:
+        TaskLabel.objects.filter(
+            task_id__in=ids, label__in=remove_labels
+        ).delete()
+    if add_labels:
+        TaskLabel.objects.bulk_create([
+            TaskLabel(task_id=task_id, label=label)
+            for task_id in ids for label in add_labels
+        ], ignore_conflicts=True)
+    result.done += ids
@@ -0,0 +1,122 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.forms.models import (
+    ModelChoiceField,
+    ModelChoiceIterator,
+    ModelMultipleChoiceField,
+)
+from django_filters import fields as filter_fields
+from django_filters import filters
+
+from task_manager.label.models import Label
+from task_manager.status.models import Status
+from task_manager.user.models import User
+
+# Columns joined with a space give the same label as the model's __str__.
+CHOICE_LABEL_FIELDS = {
+    Status: ('name',),
+    Label: ('name',),
+    User: ('first_name', 'last_name'),
+}
+
+
+def _version_key(model):
+    return f'choices:{model._meta.label_lower}:version'
+
+
+def get_version(model):
+    key = _version_key(model)
+    # A time based start value keeps an evicted counter from coming back
+    # at a number that still has a cached list.
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def bump_version(model):
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), time.time_ns(), None)
+
+
+def get_choices(model):
+    key = f'choices:{model._meta.label_lower}:{get_version(model)}'
+    choices = cache.get(key)
+    if choices is None:
+        rows = model._default_manager.order_by('pk').values_list(
+            'pk', *CHOICE_LABEL_FIELDS[model]
+        )
+        choices = tuple((pk, ' '.join(values)) for pk, *values in rows)
+        cache.set(key, choices, settings.CHOICES_CACHE_TIMEOUT)
+    return choices
+
+
+def invalidate_choices(sender, update_fields=None, **kwargs):
+    if update_fields and not (
+        set(update_fields) & set(CHOICE_LABEL_FIELDS[sender])
+    ):
+        return
+    # Bumping again on commit drops lists that other workers rebuilt from
+    # the old rows while this transaction was still open.
+    bump_version(sender)
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+def connect_signals():
+    for model in CHOICE_LABEL_FIELDS:
+        post_save.connect(invalidate_choices, sender=model)
+        post_delete.connect(invalidate_choices, sender=model)
+
+
+class CachedChoiceIterator(ModelChoiceIterator):
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from get_choices(self.queryset.model)
+
+    def __len__(self):
+        return len(get_choices(self.queryset.model)) + (
+            1 if self.field.empty_label is not None else 0
+        )
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(
+            get_choices(self.queryset.model)
+        )
+
+
+class CachedFilterChoiceIterator(
+    filter_fields.ModelChoiceIterator, CachedChoiceIterator
+):
+    pass
+
+
+class CachedModelChoiceField(ModelChoiceField):
+    iterator = CachedChoiceIterator
+
+
+class CachedModelMultipleChoiceField(ModelMultipleChoiceField):
+    iterator = CachedChoiceIterator
+
+
+class CachedFilterModelChoiceField(filter_fields.ModelChoiceField):
+    iterator = CachedFilterChoiceIterator
+
+
+class CachedFilterModelMultipleChoiceField(
+    filter_fields.ModelMultipleChoiceField
+):
+    iterator = CachedFilterChoiceIterator
+
+
+class CachedModelChoiceFilter(filters.ModelChoiceFilter):
+    field_class = CachedFilterModelChoiceField
+
+
+class CachedModelMultipleChoiceFilter(filters.ModelMultipleChoiceFilter):
+    field_class = CachedFilterModelMultipleChoiceField
@@ -0,0 +1,224 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+
+from task_manager.label.models import Label
+from task_manager.status.models import Status
+from task_manager.task.choices import get_choices
+from task_manager.task.models import Task, TaskCount, TaskLabel
+
+# Set while a bulk operation maintains the counters itself, so the per row
+# signals sent by queryset.delete() don't count the same tasks twice.
+_paused = ContextVar('task_counts_paused', default=False)
+
+APPLY_BATCH_SIZE = 100
+
+GROUPS = (
+    (TaskCount.CREATOR, Task, 'creator_id', 'status_id'),
+    (TaskCount.EXECUTOR, Task, 'executor_id', 'status_id'),
+    (TaskCount.LABEL, TaskLabel, 'label_id', 'task__status_id'),
+)
+
+
+def snapshot(task_ids=None, kinds=None):
+    counts = Counter()
+    if task_ids is not None and not task_ids:
+        return counts
+    for kind, model, key, status in GROUPS:
+        if kinds is not None and kind not in kinds:
+            continue
+        queryset = model.objects.all()
+        if task_ids is not None:
+            lookup = 'id__in' if model is Task else 'task_id__in'
+            queryset = queryset.filter(**{lookup: task_ids})
+        rows = queryset.exclude(**{key: None}).values_list(
+            key, status
+        ).annotate(total=Count('*')).order_by()
+        for key_id, status_id, total in rows:
+            counts[(kind, key_id, status_id)] += total
+    return counts
+
+
+def lock(task_ids):
+    # Taken before the "before" snapshot, so a concurrent change of the same
+    # tasks waits until this one has committed and then starts from its
+    # result instead of applying its delta to the same old state.
+    if task_ids:
+        list(Task.objects.select_for_update().filter(
+            id__in=task_ids
+        ).order_by('id').values_list('id', flat=True))
+
+
+def apply(deltas):
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    apply_label_totals(deltas)
+    TaskCount.objects.bulk_create([
+        TaskCount(kind=kind, key_id=key_id, status_id=status_id)
+        for kind, key_id, status_id in deltas
+    ], ignore_conflicts=True)
+    by_delta = {}
+    for key, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(key)
+    for delta, keys in by_delta.items():
+        for start in range(0, len(keys), APPLY_BATCH_SIZE):
+            TaskCount.objects.filter(reduce(or_, (
+                Q(kind=kind, key_id=key_id, status_id=status_id)
+                for kind, key_id, status_id in
+                keys[start:start + APPLY_BATCH_SIZE]
+            ))).update(count=F('count') + delta)
+
+
+def apply_label_totals(deltas):
+    totals = Counter()
+    for (kind, key_id, status_id), delta in deltas.items():
+        if kind == TaskCount.LABEL:
+            totals[key_id] += delta
+    by_delta = {}
+    for label_id, delta in totals.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(label_id)
+    for delta, label_ids in by_delta.items():
+        Label.objects.filter(pk__in=label_ids).update(
+            task_count=F('task_count') + delta
+        )
+
+
+def difference(after, before):
+    deltas = Counter(after)
+    deltas.subtract(before)
+    return deltas
+
+
+@contextmanager
+def track(task_ids):
+    with transaction.atomic():
+        lock(task_ids)
+        before = snapshot(task_ids)
+        token = _paused.set(True)
+        try:
+            yield
+        finally:
+            _paused.reset(token)
+        apply(difference(snapshot(task_ids), before))
+
+
+def add_tasks(task_ids):
+    apply(snapshot(task_ids))
+
+
+def rebuild():
+    with transaction.atomic():
+        TaskCount.objects.all().delete()
+        TaskCount.objects.bulk_create([
+            TaskCount(
+                kind=kind, key_id=key_id, status_id=status_id, count=count
+            )
+            for (kind, key_id, status_id), count in snapshot().items()
+        ], batch_size=1000)
+        Label.objects.update(task_count=Coalesce(Subquery(
+            TaskLabel.objects.filter(label=OuterRef('pk')).values(
+                'label'
+            ).annotate(total=Count('*')).values('total')
+        ), 0))
+
+
+def get_dashboard(user):
+    own = {
+        (kind, status_id): count
+        for kind, status_id, count in TaskCount.objects.filter(
+            kind__in=[TaskCount.CREATOR, TaskCount.EXECUTOR], key_id=user.pk
+        ).values_list('kind', 'status_id', 'count')
+    }
+    label_totals = dict(
+        TaskCount.objects.filter(kind=TaskCount.LABEL, count__gt=0)
+        .values_list('key_id').annotate(total=Sum('count')).order_by()
+    )
+    return {
+        'statuses': [
+            {
+                'id': status_id,
+                'name': name,
+                'executor': own.get((TaskCount.EXECUTOR, status_id), 0),
+                'creator': own.get((TaskCount.CREATOR, status_id), 0),
+            }
+            for status_id, name in get_choices(Status)
+        ],
+        'labels': [
+            {'id': label_id, 'name': name, 'count': label_totals[label_id]}
+            for label_id, name in get_choices(Label)
+            if label_id in label_totals
+        ],
+    }
+
+
+def remember_task(sender, instance, raw=False, **kwargs):
+    # Fixtures are counted by rebuild() once they are loaded, the rows they
+    # refer to may not exist yet.
+    if raw:
+        instance._counts_loading = True
+    if _paused.get() or raw:
+        return
+    if instance._state.adding:
+        instance._counts_before = Counter()
+    else:
+        lock([instance.pk])
+        instance._counts_before = snapshot([instance.pk])
+
+
+def count_task(sender, instance, **kwargs):
+    before = instance.__dict__.pop('_counts_before', None)
+    if before is not None:
+        apply(difference(snapshot([instance.pk]), before))
+
+
+def forget_task(sender, instance, **kwargs):
+    before = instance.__dict__.pop('_counts_before', None)
+    if before is not None:
+        apply(difference(Counter(), before))
+
+
+def get_changed_tasks(instance, reverse, pk_set):
+    if not reverse:
+        return [instance.pk]
+    if pk_set is None:
+        return list(instance.task_set.values_list('id', flat=True))
+    return list(pk_set)
+
+
+def count_labels(sender, instance, action, reverse, pk_set, **kwargs):
+    if _paused.get() or getattr(instance, '_counts_loading', False):
+        return
+    if action.startswith('pre_'):
+        task_ids = get_changed_tasks(instance, reverse, pk_set)
+        lock(task_ids)
+        instance._label_counts_before = (
+            task_ids, snapshot(task_ids, kinds=[TaskCount.LABEL])
+        )
+    elif '_label_counts_before' in instance.__dict__:
+        task_ids, before = instance.__dict__.pop('_label_counts_before')
+        apply(difference(
+            snapshot(task_ids, kinds=[TaskCount.LABEL]), before
+        ))
+
+
+def connect_signals():
+    pre_save.connect(remember_task, sender=Task)
+    post_save.connect(count_task, sender=Task)
+    pre_delete.connect(remember_task, sender=Task)
+    post_delete.connect(forget_task, sender=Task)
+    m2m_changed.connect(count_labels, sender=Task.labels.through)
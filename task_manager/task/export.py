@@ -0,0 +1,78 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+
+from task_manager.label.models import Label
+
+EXPORT_FIELDS = (
+    'id', 'name', 'description', 'status', 'creator', 'executor', 'labels',
+    'created_at',
+)
+
+
+class Echo:
+    # csv.writer only needs write(), returning the line lets it be streamed.
+
+    def write(self, value):
+        return value
+
+
+def full_name(user):
+    return f"{user.first_name} {user.last_name}" if user else ''
+
+
+def iter_rows(queryset, chunk_size=2000):
+    queryset = queryset.select_related(
+        'status', 'creator', 'executor'
+    ).only(
+        'id', 'name', 'description', 'created_at', 'status__name',
+        'creator__first_name', 'creator__last_name',
+        'executor__first_name', 'executor__last_name',
+    ).prefetch_related(
+        Prefetch('labels', queryset=Label.objects.only('name'))
+    )
+    # With chunk_size the labels are prefetched per chunk and PostgreSQL
+    # reads the rows through a server-side cursor.
+    for task in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            'id': task.id,
+            'name': task.name,
+            'description': task.description or '',
+            'status': task.status.name,
+            'creator': full_name(task.creator),
+            'executor': full_name(task.executor),
+            'labels': [label.name for label in task.labels.all()],
+            'created_at': task.created_at.isoformat(),
+        }
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        row['labels'] = '; '.join(row['labels'])
+        yield writer.writerow([row[name] for name in EXPORT_FIELDS])
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+async def aiter_batches(lines, size=100):
+    # For ASGI, which would otherwise drain a sync iterator into a list
+    # before sending anything. The lines are read in the request's sync
+    # thread, where the queryset's cursor lives, a batch at a time.
+    lines = iter(lines)
+    next_batch = sync_to_async(lambda: list(islice(lines, size)))
+    while batch := await next_batch():
+        yield ''.join(batch)
+
+
+FORMATS = {
+    'csv': (iter_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
@@ -1,36 +1,108 @@
 import django_filters
+from django.db.models import Count, Exists, OuterRef
 from django.utils.translation import gettext_lazy as _
 
 from task_manager.label.models import Label
 from task_manager.status.models import Status
-from task_manager.task.models import Task
+from task_manager.task.choices import (
+    CachedModelChoiceFilter,
+    CachedModelMultipleChoiceFilter,
+)
+from task_manager.task.models import ArchivedTask, Task
 from task_manager.user.models import User
 
 
+ANY = 'any'
+ALL = 'all'
+
+
 class TaskFilter(django_filters.FilterSet):
-    status = django_filters.ModelChoiceFilter(
+    search = django_filters.CharFilter(
+        method='filter_search',
+        label=_("Search")
+    )
+    status = CachedModelChoiceFilter(
         queryset=Status.objects.all(),
         label=_("Status")
     )
-    executor = django_filters.ModelChoiceFilter(
+    executor = CachedModelChoiceFilter(
         queryset=User.objects.all(),
         label=_("Executor")
     )
-    labels = django_filters.ModelChoiceFilter(
+    labels = CachedModelMultipleChoiceFilter(
         queryset=Label.objects.all(),
+        method='filter_labels',
         label=_("Label")
     )
+    labels_match = django_filters.ChoiceFilter(
+        choices=[(ANY, _("Any of the labels")), (ALL, _("All of the labels"))],
+        method='filter_labels_match',
+        empty_label=None,
+        label=_("Labels match")
+    )
     created_by_me = django_filters.BooleanFilter(
         method='filter_created_by_me',
         label=_("Show only my tasks"),
         widget=django_filters.widgets.forms.CheckboxInput()
     )
+    archived = django_filters.BooleanFilter(
+        method='filter_archived',
+        label=_("Include archived"),
+        widget=django_filters.widgets.forms.CheckboxInput()
+    )
+
+    # Filters that only change how the others apply.
+    modifiers = ('labels_match', 'archived')
 
     class Meta:
         model = Task
         fields = ['status', 'executor', 'labels']
 
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+    def filter_labels(self, queryset, name, value):
+        # Both variants are a single semi-join, so a task matching several
+        # of the labels is still one row. "Any" probes the (task, label)
+        # key for each task, "all" groups the labels' rows by task first
+        # because only few tasks carry every one of them.
+        label_ids = {label.pk for label in value}
+        if not label_ids:
+            return queryset
+        rows = queryset.model.labels.through.objects.filter(
+            label_id__in=label_ids
+        )
+        if self.form.cleaned_data.get('labels_match') == ALL:
+            return queryset.filter(id__in=rows.values('task_id').annotate(
+                matched=Count('*')
+            ).filter(matched=len(label_ids)).values('task_id'))
+        return queryset.filter(Exists(rows.filter(task_id=OuterRef('pk'))))
+
+    def filter_labels_match(self, queryset, name, value):
+        return queryset
+
     def filter_created_by_me(self, queryset, name, value):
         if value:
             return queryset.filter(creator=self.request.user)
         return queryset
+
+    def filter_archived(self, queryset, name, value):
+        return queryset
+
+    def has_conditions(self):
+        return self.is_bound and self.is_valid() and any(
+            value for name, value in self.form.cleaned_data.items()
+            if name not in self.modifiers
+        )
+
+    def include_archived(self):
+        # Only the hot table is read unless the archive is asked for.
+        return self.is_bound and self.is_valid() and bool(
+            self.form.cleaned_data.get('archived')
+        )
+
+    def get_archived_qs(self):
+        return type(self)(
+            self.data, queryset=ArchivedTask.objects.for_list(),
+            request=self.request
+        ).qs
@@ -1,5 +1,13 @@
+from django import forms
 from django.forms import ModelForm
+from django.utils.translation import gettext_lazy as _
 
+from task_manager.label.models import Label
+from task_manager.status.models import Status
+from task_manager.user.models import User
+from .bulk import DELETE, UPDATE
+from .choices import CachedModelChoiceField, CachedModelMultipleChoiceField
+from .importer import FORMATS, guess_format
 from .models import Task
 
 
@@ -14,9 +22,73 @@ class TaskForm(ModelForm):
             'executor',
             'labels'
         ]
+        field_classes = {
+            'status': CachedModelChoiceField,
+            'executor': CachedModelChoiceField,
+            'labels': CachedModelMultipleChoiceField,
+        }
 
     def __init__(self, *args, **kwargs):
         self.instance = kwargs.get('instance', None)
         super().__init__(*args, **kwargs)
         for field in self.fields.values():
             field.widget.attrs['placeholder'] = field.label
+
+
+class TaskBulkForm(forms.Form):
+    ids = forms.Field(required=False, widget=forms.MultipleHiddenInput)
+    query = forms.CharField(required=False, widget=forms.HiddenInput)
+    action = forms.ChoiceField(
+        label=_("Action"),
+        choices=[(UPDATE, _("Update")), (DELETE, _("Delete"))]
+    )
+    status = CachedModelChoiceField(
+        queryset=Status.objects.all(), required=False, label=_("Status")
+    )
+    executor = CachedModelChoiceField(
+        queryset=User.objects.all(), required=False, label=_("Executor")
+    )
+    add_labels = CachedModelMultipleChoiceField(
+        queryset=Label.objects.all(), required=False, label=_("Add labels")
+    )
+    remove_labels = CachedModelMultipleChoiceField(
+        queryset=Label.objects.all(), required=False,
+        label=_("Remove labels")
+    )
+
+    def clean_ids(self):
+        try:
+            return [int(value) for value in self.cleaned_data['ids'] or []]
+        except (TypeError, ValueError):
+            raise forms.ValidationError(_("Invalid task selection."))
+
+    def get_changes(self):
+        data = self.cleaned_data
+        return {
+            'action': data['action'],
+            'status': data['status'],
+            'executor': data['executor'],
+            'add_labels': list(data['add_labels']),
+            'remove_labels': list(data['remove_labels']),
+        }
+
+
+class TaskImportForm(forms.Form):
+    file = forms.FileField(label=_("File"))
+    format = forms.ChoiceField(
+        label=_("Format"), required=False,
+        choices=[('', _("By file extension"))] + [
+            (name, name.upper()) for name in FORMATS
+        ]
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        file = cleaned_data.get('file')
+        if file and not cleaned_data.get('format'):
+            cleaned_data['format'] = guess_format(file.name)
+            if cleaned_data['format'] is None:
+                raise forms.ValidationError(
+                    _("Cannot guess the file format, choose it explicitly.")
+                )
+        return cleaned_data
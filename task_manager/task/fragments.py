@@ -0,0 +1,129 @@
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from task_manager.label.models import Label
+from task_manager.status.models import Status
+from task_manager.task.choices import CHOICE_LABEL_FIELDS, get_version
+from task_manager.task.models import ListVersion, Task
+from task_manager.user.models import User
+
+
+def version_key(model, pk):
+    return f'fragment:{model._meta.label_lower}:{pk}'
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def get_list_version():
+    # The version and time of the last change of the task list as a whole,
+    # any task, status, label or user change can show up on some page.
+    row = ListVersion.objects.filter(pk=ListVersion.PK).values_list(
+        'version', 'changed_at'
+    ).first()
+    return row or (0, datetime.fromtimestamp(0, tz=timezone.utc))
+
+
+def bump_list():
+    changed = ListVersion.objects.filter(pk=ListVersion.PK).update(
+        version=F('version') + 1, changed_at=datetime.now(tz=timezone.utc)
+    )
+    if not changed:
+        ListVersion.objects.get_or_create(pk=ListVersion.PK)
+
+
+def to_datetime(version):
+    return datetime.fromtimestamp(version / 10 ** 9, tz=timezone.utc)
+
+
+def get_task_watermark(pk):
+    row = Task.objects.filter(pk=pk).values_list(
+        'updated_at', 'status_id', 'creator_id', 'executor_id'
+    ).first()
+    if row is None:
+        return None
+    updated_at, status_id, *user_ids = row
+    keys = [version_key(Status, status_id)] + [
+        version_key(User, user_id) for user_id in user_ids if user_id
+    ]
+    versions = get_versions(keys)
+    # Label membership changes touch updated_at, label renames bump the
+    # label choices version.
+    return [updated_at, get_version(Label), *(versions[key] for key in keys)]
+
+
+def bump(model, pks):
+    bump_list()
+    keys = [version_key(model, pk) for pk in pks]
+    # Bumping again on commit drops fragments that other requests rendered
+    # from the old rows while this transaction was still open.
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_task_keys(task, with_labels):
+    keys = [
+        version_key(Task, task.pk),
+        version_key(Status, task.status_id),
+        version_key(User, task.creator_id),
+    ]
+    if task.executor_id:
+        keys.append(version_key(User, task.executor_id))
+    if with_labels:
+        keys += [version_key(Label, label.pk) for label in task.labels.all()]
+    return keys
+
+
+def stamp(tasks, with_labels=False):
+    task_keys = [(task, get_task_keys(task, with_labels)) for task in tasks]
+    versions = get_versions(list({
+        key for _task, keys in task_keys for key in keys
+    }))
+    for task, keys in task_keys:
+        task.fragment_version = ';'.join(
+            f'{key}={versions[key]}' for key in keys
+        )
+    return tasks
+
+
+def invalidate_task(sender, instance, **kwargs):
+    bump(Task, [instance.pk])
+
+
+def invalidate_task_labels(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    # A reverse clear has no pk_set, but the cards still get new keys
+    # because their keys list the labels.
+    if action.startswith('post_'):
+        task_ids = (pk_set or ()) if reverse else [instance.pk]
+        Task.objects.filter(pk__in=task_ids).touch()
+        bump(Task, task_ids)
+
+
+def invalidate_related(sender, instance, update_fields=None, **kwargs):
+    # Deletes bump as well, the list's filter dropdowns name every object.
+    if update_fields and not (
+        set(update_fields) & set(CHOICE_LABEL_FIELDS[sender])
+    ):
+        return
+    bump(sender, [instance.pk])
+
+
+def connect_signals():
+    post_save.connect(invalidate_task, sender=Task)
+    post_delete.connect(invalidate_task, sender=Task)
+    m2m_changed.connect(invalidate_task_labels, sender=Task.labels.through)
+    for model in (Status, Label, User):
+        post_save.connect(invalidate_related, sender=model)
+        post_delete.connect(invalidate_related, sender=model)
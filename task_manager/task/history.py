@@ -0,0 +1,315 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.utils.translation import gettext as _
+
+from task_manager.label.models import Label
+from task_manager.status.models import Status
+from task_manager.task.choices import get_choices
+from task_manager.task.models import Task, TaskChange, TaskLabel
+from task_manager.user.models import User
+
+TRACKED_FIELDS = ('name', 'description', 'status_id', 'executor_id')
+
+WRITE_BATCH_SIZE = 500
+
+_buffer = ContextVar('task_history_buffer', default=None)
+# Set while tasks are moved to the archive, which isn't a change of them.
+_paused = ContextVar('task_history_paused', default=False)
+
+
+class Changes:
+
+    def __init__(self):
+        self.fields = {}
+        self.added = set()
+        self.removed = set()
+
+    def change(self, name, old, new):
+        if name in self.fields:
+            old = self.fields[name][0]
+        if old == new:
+            self.fields.pop(name, None)
+        else:
+            self.fields[name] = [old, new]
+
+    def add_labels(self, label_ids):
+        label_ids = set(label_ids)
+        self.added |= label_ids - self.removed
+        self.removed -= label_ids
+
+    def remove_labels(self, label_ids):
+        label_ids = set(label_ids)
+        self.removed |= label_ids - self.added
+        self.added -= label_ids
+
+    def as_dict(self):
+        data = dict(self.fields)
+        if self.added or self.removed:
+            data['labels'] = {
+                'added': sorted(self.added),
+                'removed': sorted(self.removed),
+            }
+        return data
+
+
+class Buffer:
+    # Collects the changes of one request. Every task gets one row with
+    # all of its changes, and the rows are written in one insert.
+
+    def __init__(self, user=None):
+        self.user = user
+        self.tasks = defaultdict(Changes)
+        self.pending = 0
+
+    def add(self, task_id, fields=(), added=(), removed=()):
+        changes = self.tasks[task_id]
+        for name, old, new in fields:
+            changes.change(name, old, new)
+        changes.remove_labels(removed)
+        changes.add_labels(added)
+
+    def write(self):
+        rows = [
+            (task_id, changes.as_dict())
+            for task_id, changes in self.tasks.items()
+        ]
+        self.tasks.clear()
+        rows = [(task_id, data) for task_id, data in rows if data]
+        if not rows:
+            return
+        user_id = getattr(self.user, 'pk', None)
+        TaskChange.objects.bulk_create([
+            TaskChange(task_id=task_id, user_id=user_id, changes=data)
+            for task_id, data in rows
+        ], batch_size=WRITE_BATCH_SIZE)
+
+
+def record(task_id, fields=(), added=(), removed=()):
+    if _paused.get():
+        return
+    buffer = _buffer.get()
+    if buffer is None:
+        with recording():
+            return record(task_id, fields, added, removed)
+    # Changes of a rolled back transaction never reach the buffer.
+    buffer.pending += 1
+    transaction.on_commit(partial(
+        buffer.add, task_id, list(fields), list(added), list(removed)
+    ))
+
+
+@contextmanager
+def recording(user=None):
+    if _buffer.get() is not None:
+        yield _buffer.get()
+        return
+    buffer = Buffer(user)
+    token = _buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _buffer.reset(token)
+        flush(buffer)
+
+
+def flush(buffer):
+    # Registered after the changes, so it runs after them on commit.
+    if buffer.pending:
+        transaction.on_commit(buffer.write)
+
+
+@contextmanager
+def paused():
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+class HistoryMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with recording(request.user):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # The buffer is set in the request's context, which the sync parts
+        # of the request run in a copy of. Writing it needs a sync context.
+        buffer = Buffer(request.user)
+        token = _buffer.set(buffer)
+        try:
+            return await self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            await sync_to_async(flush)(buffer)
+
+
+def get_field_changes(before, after):
+    # An empty description is the same as none.
+    return [
+        (name.removesuffix('_id'), before[name], after[name])
+        for name in TRACKED_FIELDS
+        if name in after and (before[name] or None) != (after[name] or None)
+    ]
+
+
+def record_bulk_update(rows, changes, label_pairs, add_labels,
+                       remove_labels):
+    # rows are the tasks' columns read before the update, label_pairs the
+    # (task_id, label_id) rows of the bulk labels. Labels are removed
+    # first and added after.
+    labels_before = defaultdict(set)
+    for task_id, label_id in label_pairs:
+        labels_before[task_id].add(label_id)
+    add = {label.pk for label in add_labels}
+    remove = {label.pk for label in remove_labels}
+    for task_id, before in rows.items():
+        labels = labels_before[task_id]
+        record(
+            task_id,
+            fields=get_field_changes(before, changes),
+            added=add - labels,
+            removed=labels & remove - add,
+        )
+
+
+def prune(before, batch_size=5000):
+    # Deleted in short batches along the created_at index, so a large
+    # backlog doesn't hold one long lock on the table.
+    deleted = 0
+    while True:
+        ids = list(TaskChange.objects.filter(
+            created_at__lt=before
+        ).order_by('created_at').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += TaskChange.objects.filter(id__in=ids).delete()[0]
+
+
+def describe(changes, names):
+    rows = []
+    for name, label in (('name', _("Name")),
+                        ('description', _("Description")),
+                        ('status', _("Status")),
+                        ('executor', _("Executor"))):
+        if name in changes:
+            old, new = changes[name]
+            lookup = names.get(name, {})
+            rows.append((
+                label, lookup.get(old, old), lookup.get(new, new)
+            ))
+    if 'labels' in changes:
+        rows.append((_("Labels"), *(
+            ', '.join(names['labels'].get(pk, f'#{pk}') for pk in ids)
+            for ids in (changes['labels']['removed'],
+                        changes['labels']['added'])
+        )))
+    return rows
+
+
+def get_names():
+    return {
+        name: dict(get_choices(model))
+        for name, model in (('status', Status), ('executor', User),
+                            ('labels', Label))
+    }
+
+
+def remember_task(sender, instance, raw=False, **kwargs):
+    # Fixture loads aren't changes, their label sets are skipped as well.
+    if raw:
+        instance._history_loading = True
+    elif not instance._state.adding:
+        instance._history_before = Task.objects.filter(
+            pk=instance.pk
+        ).values(*TRACKED_FIELDS).first()
+
+
+def record_task(sender, instance, created, **kwargs):
+    before = instance.__dict__.pop('_history_before', None)
+    if before is not None:
+        deferred = instance.get_deferred_fields()
+        after = {
+            name: getattr(instance, name) for name in TRACKED_FIELDS
+            if name not in deferred
+        }
+        record(instance.pk, fields=get_field_changes(before, after))
+
+
+def record_deleted_task(sender, instance, **kwargs):
+    record(instance.pk, fields=[('name', instance.name, None)])
+
+
+def get_label_pairs(instance, reverse, pk_set):
+    if reverse:
+        rows = TaskLabel.objects.filter(label_id=instance.pk)
+        lookup = 'task_id__in'
+    else:
+        rows = TaskLabel.objects.filter(task_id=instance.pk)
+        lookup = 'label_id__in'
+    if pk_set is not None:
+        rows = rows.filter(**{lookup: pk_set})
+    return list(rows.values_list('task_id', 'label_id'))
+
+
+def group_pairs(pairs):
+    by_task = defaultdict(list)
+    for task_id, label_id in pairs:
+        by_task[task_id].append(label_id)
+    return by_task.items()
+
+
+def record_labels(sender, instance, action, reverse, pk_set, **kwargs):
+    if not getattr(instance, '_history_loading', False):
+        record_label_action(instance, action, reverse, pk_set)
+
+
+def record_label_action(instance, action, reverse, pk_set):
+    # pre_add already narrows pk_set to the missing labels, removals are
+    # checked against the table so that removing an absent label is no
+    # change.
+    if action in ('pre_remove', 'pre_clear'):
+        instance._history_removed = get_label_pairs(instance, reverse, pk_set)
+    elif action == 'post_add':
+        pairs = [
+            (pk, instance.pk) if reverse else (instance.pk, pk)
+            for pk in pk_set
+        ]
+        for task_id, label_ids in group_pairs(pairs):
+            record(task_id, added=label_ids)
+    elif action in ('post_remove', 'post_clear'):
+        pairs = instance.__dict__.pop('_history_removed', ())
+        for task_id, label_ids in group_pairs(pairs):
+            record(task_id, removed=label_ids)
+
+
+def connect_signals():
+    pre_save.connect(remember_task, sender=Task)
+    post_save.connect(record_task, sender=Task)
+    post_delete.connect(record_deleted_task, sender=Task)
+    m2m_changed.connect(record_labels, sender=Task.labels.through)
@@ -0,0 +1,173 @@
+import csv
+import json
+
+from django.db import transaction
+from django.utils.translation import gettext as _
+
+from task_manager.label.models import Label
+from task_manager.status.models import Status
+from task_manager.task import counters, fragments
+from task_manager.task.bulk import BulkResult, chunked
+from task_manager.task.choices import invalidate_choices
+from task_manager.task.models import Task, TaskLabel
+from task_manager.user.models import User
+
+FORMATS = ('csv', 'json', 'ndjson')
+NAME_MAX_LENGTH = Task._meta.get_field('name').max_length
+STATUS_MAX_LENGTH = Status._meta.get_field('name').max_length
+LABEL_MAX_LENGTH = Label._meta.get_field('name').max_length
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def guess_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return extension if extension in FORMATS else None
+
+
+def read_rows(stream, file_format):
+    try:
+        if file_format == 'csv':
+            rows = list(csv.DictReader(stream))
+        elif file_format == 'json':
+            rows = json.load(stream)
+        else:
+            rows = [json.loads(line) for line in stream if line.strip()]
+    except (csv.Error, UnicodeDecodeError, ValueError) as error:
+        raise ImportFormatError(str(error))
+    if not isinstance(rows, list) or not all(
+        isinstance(row, dict) for row in rows
+    ):
+        raise ImportFormatError(_("Expected a list of task objects."))
+    return rows
+
+
+def split_labels(value):
+    # None marks a value that is neither a list nor a string, it is
+    # reported as an error of its row.
+    if value is None:
+        return set()
+    if isinstance(value, str):
+        value = value.split(';')
+    if not isinstance(value, list) or not all(
+        isinstance(name, (str, int, float)) for name in value
+    ):
+        return None
+    return {str(name).strip() for name in value} - {''}
+
+
+def clean_row(row):
+    return {
+        'name': str(row.get('name') or '').strip(),
+        'description': row.get('description') or '',
+        'status': str(row.get('status') or '').strip(),
+        'executor': str(row.get('executor') or '').strip(),
+        'labels': split_labels(row.get('labels')),
+    }
+
+
+def fetch_existing(model, field, values, batch_size):
+    found = {}
+    for chunk in chunked(sorted(values), batch_size):
+        found.update(
+            model.objects.filter(**{f'{field}__in': chunk})
+            .values_list(field, 'id')
+        )
+    return found
+
+
+def get_or_create_names(model, names, batch_size):
+    found = fetch_existing(model, 'name', names, batch_size)
+    missing = [model(name=name) for name in sorted(names - set(found))]
+    if missing:
+        model.objects.bulk_create(missing, batch_size=batch_size)
+        found.update((obj.name, obj.id) for obj in missing)
+        invalidate_choices(model)
+    return found
+
+
+def validate(result, rows, taken_names, users):
+    valid = []
+    for number, row in enumerate(rows, 1):
+        error = get_row_error(row, taken_names, users)
+        if error:
+            result.fail(number, error)
+            continue
+        taken_names.add(row['name'])
+        valid.append(row)
+    return valid
+
+
+def get_row_error(row, taken_names, users):
+    return (
+        get_name_error(row['name'], taken_names)
+        or get_reference_error(row, users)
+        or get_labels_error(row['labels'])
+    )
+
+
+def get_name_error(name, taken_names):
+    if not name:
+        return _("Task name is required.")
+    if len(name) > NAME_MAX_LENGTH:
+        return _("Task name is too long.")
+    if name in taken_names:
+        return _("Task with this name already exists.")
+    return None
+
+
+def get_reference_error(row, users):
+    if not row['status']:
+        return _("Status is required.")
+    if len(row['status']) > STATUS_MAX_LENGTH:
+        return _("Status name is too long.")
+    if row['executor'] and row['executor'] not in users:
+        return _("Unknown executor.")
+    return None
+
+
+def get_labels_error(labels):
+    if labels is None:
+        return _('Labels must be a list or a string separated by ";".')
+    if any(len(name) > LABEL_MAX_LENGTH for name in labels):
+        return _("Label name is too long.")
+    return None
+
+
+def import_tasks(user, rows, batch_size=1000):
+    result = BulkResult()
+    rows = [clean_row(row) for row in rows]
+    taken_names = set(fetch_existing(
+        Task, 'name', {row['name'] for row in rows}, batch_size
+    ))
+    users = fetch_existing(
+        User, 'username', {row['executor'] for row in rows}, batch_size
+    )
+    rows = validate(result, rows, taken_names, users)
+    with transaction.atomic():
+        statuses = get_or_create_names(
+            Status, {row['status'] for row in rows}, batch_size
+        )
+        labels = get_or_create_names(
+            Label, set().union(*(row['labels'] for row in rows)), batch_size
+        )
+        for chunk in chunked(rows, batch_size):
+            tasks = Task.objects.bulk_create([
+                Task(
+                    name=row['name'],
+                    description=row['description'],
+                    status_id=statuses[row['status']],
+                    executor_id=users.get(row['executor']),
+                    creator=user,
+                ) for row in chunk
+            ])
+            TaskLabel.objects.bulk_create([
+                TaskLabel(task_id=task.id, label_id=labels[name])
+                for task, row in zip(tasks, chunk) for name in row['labels']
+            ], batch_size=batch_size)
+            counters.add_tasks([task.id for task in tasks])
+            result.done += [task.id for task in tasks]
+        fragments.bump(Task, [])
+    return result
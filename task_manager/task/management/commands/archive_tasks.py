@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from task_manager.status.models import Status
+from task_manager.task import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move tasks in the done statuses that haven't changed for a number "
+        "of days to the archive table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', action='append', dest='statuses',
+            help="Name of a done status, can be repeated"
+        )
+        parser.add_argument(
+            '--days', type=int, default=settings.TASK_ARCHIVE_AFTER_DAYS
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Only count the tasks that would be archived"
+        )
+
+    def handle(self, *args, **options):
+        names = options['statuses'] or settings.TASK_ARCHIVE_STATUSES
+        if not names:
+            raise CommandError(
+                "No done statuses, pass --status or set TASK_ARCHIVE_STATUSES"
+            )
+        status_ids = dict(
+            Status.objects.filter(name__in=names).values_list('name', 'id')
+        )
+        missing = set(names) - set(status_ids)
+        if missing:
+            raise CommandError(
+                f"Unknown statuses: {', '.join(sorted(missing))}"
+            )
+        before = timezone.now() - timedelta(days=options['days'])
+        if options['dry_run']:
+            count = archive.get_archivable(status_ids.values(), before).count()
+            self.stdout.write(f"{count} tasks would be archived")
+            return
+        count = archive.archive_tasks(
+            list(status_ids.values()), before,
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f"{count} tasks archived"))
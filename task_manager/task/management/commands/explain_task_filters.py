@@ -0,0 +1,72 @@
+from itertools import combinations
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.task.filters import ALL, TaskFilter
+from task_manager.task.models import Task, TaskLabel
+from task_manager.task.views import TaskIndexView
+from task_manager.user.models import User
+from task_manager.utils import KeysetPaginator
+
+FILTERS = ('status', 'executor', 'labels', 'created_by_me')
+
+
+class Command(BaseCommand):
+    help = "Print the query plan of the task list for every filter combination"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username')
+        parser.add_argument(
+            '--per-page', type=int, default=TaskIndexView.paginate_by
+        )
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help="Run EXPLAIN ANALYZE (PostgreSQL only)"
+        )
+
+    def handle(self, *args, **options):
+        task = Task.objects.exclude(executor=None).first()
+        if task is None:
+            raise CommandError("Explaining needs a task with an executor")
+        user = (
+            User.objects.get(username=options['username'])
+            if options['username'] else task.creator
+        )
+        values = {
+            'status': task.status_id,
+            'executor': task.executor_id,
+            'labels': list(TaskLabel.objects.values_list(
+                'label_id', flat=True
+            ).distinct()[:2]),
+            'created_by_me': 'on',
+        }
+        cursor = [task.created_at, task.id]
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        for title, data in get_combinations(values):
+            queryset = TaskFilter(
+                data, queryset=Task.objects.for_list(),
+                request=SimpleNamespace(user=user)
+            ).qs
+            paginator = KeysetPaginator(
+                queryset, options['per_page'],
+                ordering=TaskIndexView.keyset_ordering
+            )
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            for page, page_values in (('first page', None),
+                                      ('next page', cursor)):
+                plan = paginator.get_page_queryset(page_values).explain(
+                    **explain_options
+                )
+                self.stdout.write(f"-- {page}\n{plan}\n")
+
+
+def get_combinations(values):
+    for size in range(len(FILTERS) + 1):
+        for names in combinations(FILTERS, size):
+            yield (
+                ', '.join(names) or 'no filters',
+                {name: values[name] for name in names}
+            )
+    # Matching all of the labels is planned differently from matching any.
+    yield 'labels_match=all', {'labels': values['labels'], 'labels_match': ALL}
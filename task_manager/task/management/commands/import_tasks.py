@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.task import importer
+from task_manager.user.models import User
+
+
+class Command(BaseCommand):
+    help = "Import tasks from a CSV, JSON or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--format', choices=importer.FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def get_user(self, username):
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {username}")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        file_format = (
+            options['format'] or importer.guess_format(options['path'])
+        )
+        if file_format is None:
+            raise CommandError("Cannot guess the format, pass --format")
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            try:
+                rows = importer.read_rows(file, file_format)
+            except importer.ImportFormatError as error:
+                raise CommandError(error)
+        result = importer.import_tasks(
+            user, rows, batch_size=options['batch_size']
+        )
+        for number, message in result.failures:
+            self.stderr.write(f"Row {number}: {message}")
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(result.done)} tasks imported")
+        )
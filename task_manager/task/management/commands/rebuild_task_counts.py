@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from task_manager.task import counters
+from task_manager.task.models import TaskCount
+
+
+class Command(BaseCommand):
+    help = "Recalculate the task counters from the task table"
+
+    def handle(self, *args, **options):
+        counters.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"{TaskCount.objects.count()} counters rebuilt"
+        ))
@@ -0,0 +1,93 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('label', '0001_initial'),
+        ('status', '0001_initial'),
+        ('task', '0003_alter_task_description_alter_task_executor_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        # task_task_labels already exists as the auto-created M2M table, the
+        # explicit through model only takes it over in the migration state.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='TaskLabel',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('label', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='label.label')),
+                        ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='task.task')),
+                    ],
+                    options={
+                        'db_table': 'task_task_labels',
+                        'unique_together': {('task', 'label')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='task',
+                    name='labels',
+                    field=models.ManyToManyField(blank=True, through='task.TaskLabel', to='label.label', verbose_name='Labels'),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at', '-id'], name='task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='task_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', '-created_at', '-id'], name='task_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['creator', 'status', '-created_at', '-id'], name='task_creator_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('executor__isnull', False)), fields=['executor', '-created_at', '-id'], name='task_executor_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('executor__isnull', False)), fields=['executor', 'status', '-created_at', '-id'], name='task_executor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklabel',
+            index=models.Index(fields=['label', 'task'], name='task_label_label_task_idx'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='creator',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='created_tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='status.status', verbose_name='Status'),
+        ),
+        migrations.AlterField(
+            model_name='tasklabel',
+            name='label',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='label.label'),
+        ),
+        migrations.AlterField(
+            model_name='tasklabel',
+            name='task',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='task.task'),
+        ),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from task_manager.task.search import install_index, uninstall_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0004_task_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, uninstall_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counts(apps, schema_editor):
+    Task = apps.get_model('task', 'Task')
+    TaskLabel = apps.get_model('task', 'TaskLabel')
+    TaskCount = apps.get_model('task', 'TaskCount')
+    groups = (
+        ('creator', Task.objects.all(), 'creator_id', 'status_id'),
+        ('executor', Task.objects.exclude(executor=None),
+         'executor_id', 'status_id'),
+        ('label', TaskLabel.objects.all(), 'label_id', 'task__status_id'),
+    )
+    for kind, queryset, key, status in groups:
+        rows = queryset.values_list(key, status).annotate(
+            total=Count('*')
+        ).order_by()
+        TaskCount.objects.bulk_create([
+            TaskCount(
+                kind=kind, key_id=key_id, status_id=status_id, count=total
+            )
+            for key_id, status_id, total in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('status', '0001_initial'),
+        ('task', '0005_task_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('creator', 'Creator'), ('executor', 'Executor'), ('label', 'Label')], max_length=10)),
+                ('key_id', models.BigIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='status.status')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'key_id', 'status'), name='task_count_unique')],
+            },
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
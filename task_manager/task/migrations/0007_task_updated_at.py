@@ -0,0 +1,26 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+from task_manager.task.search import install_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0006_task_counts'),
+    ]
+
+    operations = [
+        # Adding the column rebuilds task_task on SQLite, which drops the
+        # search triggers, so they are installed again afterwards.
+        migrations.RunPython(migrations.RunPython.noop, install_index),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(install_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0007_task_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskChange',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID'
+                )),
+                ('created_at', models.DateTimeField(
+                    default=django.utils.timezone.now
+                )),
+                ('changes', models.JSONField()),
+                ('task', models.ForeignKey(
+                    db_constraint=False, db_index=False,
+                    on_delete=django.db.models.deletion.DO_NOTHING,
+                    related_name='changes', to='task.task'
+                )),
+                ('user', models.ForeignKey(
+                    db_constraint=False, db_index=False, null=True,
+                    on_delete=django.db.models.deletion.DO_NOTHING,
+                    related_name='+', to=settings.AUTH_USER_MODEL
+                )),
+            ],
+            options={
+                'indexes': [
+                    models.Index(
+                        fields=['task', '-created_at', '-id'],
+                        name='task_change_task_idx'
+                    ),
+                    models.Index(
+                        fields=['created_at'], name='task_change_created_idx'
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('label', '0002_label_task_count'),
+        ('status', '0001_initial'),
+        ('task', '0008_task_change'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(
+                    primary_key=True, serialize=False
+                )),
+                ('name', models.CharField(
+                    max_length=150, verbose_name='Name'
+                )),
+                ('description', models.TextField(
+                    blank=True, null=True, verbose_name='Description'
+                )),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(
+                    default=django.utils.timezone.now
+                )),
+                ('creator', models.ForeignKey(
+                    on_delete=django.db.models.deletion.PROTECT,
+                    related_name='archived_created_tasks',
+                    to=settings.AUTH_USER_MODEL
+                )),
+                ('executor', models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.PROTECT,
+                    related_name='archived_executed_tasks',
+                    to=settings.AUTH_USER_MODEL, verbose_name='Executor'
+                )),
+                ('status', models.ForeignKey(
+                    on_delete=django.db.models.deletion.PROTECT,
+                    related_name='archived_tasks', to='status.status',
+                    verbose_name='Status'
+                )),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [
+                    models.Index(
+                        fields=['-created_at', '-id'],
+                        name='archived_created_idx'
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTaskLabel',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID'
+                )),
+                ('label', models.ForeignKey(
+                    db_index=False,
+                    on_delete=django.db.models.deletion.PROTECT,
+                    to='label.label'
+                )),
+                ('task', models.ForeignKey(
+                    db_index=False,
+                    on_delete=django.db.models.deletion.CASCADE,
+                    to='task.archivedtask'
+                )),
+            ],
+            options={
+                'unique_together': {('task', 'label')},
+                'indexes': [
+                    models.Index(
+                        fields=['label', 'task'],
+                        name='archived_label_task_idx'
+                    ),
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='labels',
+            field=models.ManyToManyField(
+                related_name='archived_tasks',
+                through='task.ArchivedTaskLabel', to='label.label',
+                verbose_name='Labels'
+            ),
+        ),
+    ]
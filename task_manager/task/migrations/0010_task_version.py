@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+from task_manager.task.search import install_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0009_archived_task'),
+    ]
+
+    operations = [
+        # Adding the column rebuilds task_task on SQLite, which drops the
+        # search triggers, so they are installed again afterwards.
+        migrations.RunPython(migrations.RunPython.noop, install_index),
+        migrations.AddField(
+            model_name='task',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(install_index, migrations.RunPython.noop),
+    ]
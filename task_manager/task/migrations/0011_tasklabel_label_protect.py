@@ -0,0 +1,22 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('label', '0002_label_task_count'),
+        ('task', '0010_task_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tasklabel',
+            name='label',
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to='label.label'
+            ),
+        ),
+    ]
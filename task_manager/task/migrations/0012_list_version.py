@@ -0,0 +1,30 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_row(apps, schema_editor):
+    apps.get_model('task', 'ListVersion').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0011_tasklabel_label_protect'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListVersion',
+            fields=[
+                ('id', models.BigAutoField(
+                    auto_created=True, primary_key=True, serialize=False,
+                    verbose_name='ID'
+                )),
+                ('version', models.BigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(
+                    default=django.utils.timezone.now
+                )),
+            ],
+        ),
+        migrations.RunPython(create_row, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,51 @@
-from django.db import models
+from django.db import connections, models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from task_manager.label.models import Label
+from task_manager.task.search import fallback_search, get_search, get_terms
 from task_manager.status.models import Status
 from task_manager.user.models import User
 
 
+class TaskQuerySet(models.QuerySet):
+    list_fields = (
+        'id', 'name', 'created_at', 'status__name',
+        'creator__first_name', 'creator__last_name',
+        'executor__first_name', 'executor__last_name',
+    )
+
+    def for_list(self):
+        return self.select_related(
+            'status', 'creator', 'executor'
+        ).only(*self.list_fields)
+
+    def for_page(self):
+        return self.select_related(
+            'status', 'creator', 'executor'
+        ).only(*self.list_fields, 'description').prefetch_related(
+            models.Prefetch('labels', queryset=Label.objects.only('name'))
+        )
+
+    def for_delete(self):
+        return self.only('id', 'name', 'creator_id')
+
+    def touch(self):
+        return self.update(
+            updated_at=timezone.now(), version=models.F('version') + 1
+        )
+
+    def search(self, query):
+        terms = get_terms(query)
+        if not terms:
+            return self.annotate(search_rank=models.Value(0.0)).none()
+        condition, rank = get_search(connections[self.db].vendor, terms)
+        return self.filter(condition).annotate(search_rank=rank)
+
+
 class Task(models.Model):
+    is_archived = False
+
     name = models.CharField(
         max_length=150, blank=False, unique=True, verbose_name=_("Name"),
         error_messages={
@@ -18,11 +56,12 @@ class Task(models.Model):
         blank=True, null=True, verbose_name=_("Description")
     )
     status = models.ForeignKey(
-        Status, blank=False, on_delete=models.PROTECT, verbose_name=_("Status")
+        Status, blank=False, on_delete=models.PROTECT, verbose_name=_("Status"),
+        db_index=False
     )
     creator = models.ForeignKey(
         User, related_name="created_tasks",
-        blank=False, on_delete=models.PROTECT
+        blank=False, on_delete=models.PROTECT, db_index=False
     )
     executor = models.ForeignKey(
         User, related_name="executed_tasks",
@@ -30,9 +69,206 @@ class Task(models.Model):
         verbose_name=_("Executor")
     )
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Incremented by every update, see utils.UpdateViewMixin.
+    version = models.PositiveIntegerField(default=0, editable=False)
     labels = models.ManyToManyField(
-        Label, blank=True, verbose_name=_("Labels")
+        Label, blank=True, through='TaskLabel', verbose_name=_("Labels")
     )
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        # The list is always read newest first, optionally narrowed by
+        # status, executor and creator, so each filter column leads an index
+        # that also covers the ordering. The plain indexes on status_id and
+        # creator_id are dropped because these ones start with them.
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'], name='task_created_idx'
+            ),
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='task_status_created_idx'
+            ),
+            models.Index(
+                fields=['creator', '-created_at', '-id'],
+                name='task_creator_created_idx'
+            ),
+            models.Index(
+                fields=['creator', 'status', '-created_at', '-id'],
+                name='task_creator_status_idx'
+            ),
+            models.Index(
+                fields=['executor', '-created_at', '-id'],
+                name='task_executor_created_idx',
+                condition=models.Q(executor__isnull=False)
+            ),
+            models.Index(
+                fields=['executor', 'status', '-created_at', '-id'],
+                name='task_executor_status_idx',
+                condition=models.Q(executor__isnull=False)
+            ),
+        ]
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        # The counters are updated from the save signals and have to be
+        # committed together with the row.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class TaskLabel(models.Model):
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, db_index=False)
+    label = models.ForeignKey(Label, on_delete=models.PROTECT, db_index=False)
+
+    class Meta:
+        db_table = 'task_task_labels'
+        unique_together = [('task', 'label')]
+        # The unique constraint serves task -> labels lookups and this index
+        # serves label -> tasks, which makes the single column FK indexes
+        # of the auto-created table redundant.
+        indexes = [
+            models.Index(
+                fields=['label', 'task'], name='task_label_label_task_idx'
+            ),
+        ]
+
+
+class TaskCount(models.Model):
+    CREATOR = 'creator'
+    EXECUTOR = 'executor'
+    LABEL = 'label'
+    KINDS = [
+        (CREATOR, _("Creator")),
+        (EXECUTOR, _("Executor")),
+        (LABEL, _("Label")),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    # A user id for creator and executor counts, a label id for label counts.
+    key_id = models.BigIntegerField()
+    status = models.ForeignKey(Status, on_delete=models.CASCADE)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'key_id', 'status'],
+                name='task_count_unique'
+            ),
+        ]
+
+
+class ListVersion(models.Model):
+    # A single row, bumped in the transaction of every write that can show
+    # up on the task list. Unlike the cache it is shared by every process,
+    # so the list's ETag is taken from it.
+    PK = 1
+
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+
+class TaskChange(models.Model):
+    # Append-only. The task and user columns have no foreign key
+    # constraint, so the history outlives deleted tasks and users.
+    task = models.ForeignKey(
+        Task, related_name='changes', on_delete=models.DO_NOTHING,
+        db_constraint=False, db_index=False
+    )
+    user = models.ForeignKey(
+        User, related_name='+', null=True, on_delete=models.DO_NOTHING,
+        db_constraint=False, db_index=False
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    # Only the changed fields: {"status": [old, new], ...} plus
+    # {"labels": {"added": [...], "removed": [...]}}.
+    changes = models.JSONField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['task', '-created_at', '-id'],
+                name='task_change_task_idx'
+            ),
+            models.Index(
+                fields=['created_at'], name='task_change_created_idx'
+            ),
+        ]
+
+
+class ArchivedTaskQuerySet(TaskQuerySet):
+
+    def search(self, query):
+        # The archive has no full text index, it is searched with LIKE.
+        terms = get_terms(query)
+        if not terms:
+            return self.annotate(search_rank=models.Value(0.0)).none()
+        condition, rank = fallback_search(terms)
+        return self.filter(condition).annotate(search_rank=rank)
+
+
+class ArchivedTask(models.Model):
+    # Finished tasks moved out of task_task by task.archive. The id is the
+    # one the task had, and status, creator, executor and labels are still
+    # protected from deletion while an archived task refers to them.
+    is_archived = True
+
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=150, verbose_name=_("Name"))
+    description = models.TextField(
+        blank=True, null=True, verbose_name=_("Description")
+    )
+    status = models.ForeignKey(
+        Status, related_name='archived_tasks', on_delete=models.PROTECT,
+        verbose_name=_("Status")
+    )
+    creator = models.ForeignKey(
+        User, related_name='archived_created_tasks', on_delete=models.PROTECT
+    )
+    executor = models.ForeignKey(
+        User, related_name='archived_executed_tasks', null=True,
+        on_delete=models.PROTECT, verbose_name=_("Executor")
+    )
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    labels = models.ManyToManyField(
+        Label, related_name='archived_tasks', through='ArchivedTaskLabel',
+        verbose_name=_("Labels")
+    )
+
+    objects = ArchivedTaskQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'], name='archived_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class ArchivedTaskLabel(models.Model):
+    task = models.ForeignKey(
+        ArchivedTask, on_delete=models.CASCADE, db_index=False
+    )
+    label = models.ForeignKey(
+        Label, on_delete=models.PROTECT, db_index=False
+    )
+
+    class Meta:
+        unique_together = [('task', 'label')]
+        indexes = [
+            models.Index(
+                fields=['label', 'task'], name='archived_label_task_idx'
+            ),
+        ]
@@ -0,0 +1,137 @@
+import re
+
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TERM_RE = re.compile(r'[^\W_]+')
+SQLITE_TABLE = 'task_task_fts'
+
+POSTGRESQL_INSTALL = [
+    # A generated column is kept up to date by PostgreSQL on every write,
+    # including bulk_create and queryset.update().
+    """
+    ALTER TABLE task_task ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS task_search_idx
+    ON task_task USING GIN (search_vector)
+    """,
+]
+POSTGRESQL_UNINSTALL = [
+    "ALTER TABLE task_task DROP COLUMN search_vector",
+]
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5(
+        name, description, content='task_task', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_task_fts_insert
+    AFTER INSERT ON task_task BEGIN
+        INSERT INTO {SQLITE_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_task_fts_delete
+    AFTER DELETE ON task_task BEGIN
+        INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_task_fts_update
+    AFTER UPDATE OF name, description ON task_task BEGIN
+        INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {SQLITE_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"INSERT INTO {SQLITE_TABLE}({SQLITE_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS task_task_fts_insert",
+    "DROP TRIGGER IF EXISTS task_task_fts_delete",
+    "DROP TRIGGER IF EXISTS task_task_fts_update",
+    f"DROP TABLE IF EXISTS {SQLITE_TABLE}",
+]
+
+
+def install_index(apps, schema_editor):
+    # SQLite drops the triggers whenever a migration rebuilds task_task, so
+    # such migrations have to run this again; every statement is idempotent.
+    run(schema_editor, {
+        'postgresql': POSTGRESQL_INSTALL, 'sqlite': SQLITE_INSTALL
+    })
+
+
+def uninstall_index(apps, schema_editor):
+    run(schema_editor, {
+        'postgresql': POSTGRESQL_UNINSTALL, 'sqlite': SQLITE_UNINSTALL
+    })
+
+
+def run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def get_terms(query):
+    return TERM_RE.findall(query)
+
+
+def postgresql_search(terms):
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    return (
+        RawSQL(
+            "task_task.search_vector @@ to_tsquery('simple', %s)",
+            [tsquery], output_field=BooleanField()
+        ),
+        # float8 keeps the rank exact when it goes through a page cursor.
+        RawSQL(
+            "ts_rank(task_task.search_vector, to_tsquery('simple', %s))"
+            "::float8",
+            [tsquery], output_field=FloatField()
+        ),
+    )
+
+
+def sqlite_search(terms):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return (
+        RawSQL(
+            f"task_task.id IN (SELECT rowid FROM {SQLITE_TABLE} "
+            f"WHERE {SQLITE_TABLE} MATCH %s)",
+            [match], output_field=BooleanField()
+        ),
+        # bm25 is better when lower, negate it to sort like ts_rank.
+        RawSQL(
+            f"(SELECT -rank FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} "
+            f"MATCH %s AND rowid = task_task.id)",
+            [match], output_field=FloatField()
+        ),
+    )
+
+
+def fallback_search(terms):
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(description__icontains=term)
+    return condition, Value(0.0)
+
+
+BACKENDS = {
+    'postgresql': postgresql_search,
+    'sqlite': sqlite_search,
+}
+
+
+def get_search(vendor, terms):
+    return BACKENDS.get(vendor, fallback_search)(terms)
@@ -1,10 +1,37 @@
-from django.test import RequestFactory
+import csv
+import json
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from tempfile import NamedTemporaryFile
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 from task_manager.label.models import Label
 from task_manager.status.models import Status
-from task_manager.task.models import Task
+from task_manager.task import counters, history, importer
+from task_manager.task.choices import get_version
+from task_manager.task.filters import TaskFilter
+from task_manager.task.models import (
+    ArchivedTask,
+    Task,
+    TaskChange,
+    TaskCount,
+)
 from task_manager.task.views import TaskIndexView
 from task_manager.user.models import User
 from task_manager.utils import BaseTestCase
@@ -126,13 +153,14 @@ class TestTaskCreate(BaseTestCase):
 class TestTaskUpdate(BaseTestCase):
 
     def setUp(self):
-        self.task = Task.objects.all().first()
+        self.task = Task.objects.get(id=1)
         self.user = User.objects.all().first()
         self.updated_task_data = {
             'name': 'new_task',
             'description': 'new_description',
             'creator': self.task.creator.id,
-            'status': self.task.status.id
+            'status': self.task.status.id,
+            'version': self.task.version,
         }
 
     def test_update_task_success(self):
@@ -148,6 +176,46 @@ class TestTaskUpdate(BaseTestCase):
             response, 'task_index', _("Task is updated successfully")
         )
 
+    def test_stale_update_shows_conflict(self):
+        self.login_user(self.user)
+        url = reverse('task_update', kwargs={'pk': 1})
+        self.assertContains(
+            self.client.get(url),
+            f'name="version" value="{self.task.version}"'
+        )
+        self.client.post(url, self.updated_task_data)
+        self.task.refresh_from_db()
+        self.assertGreater(
+            self.task.version, self.updated_task_data['version']
+        )
+        response = self.client.post(url, {
+            **self.updated_task_data, 'name': 'stale_name'
+        })
+        self.assertEqual(response.status_code, 200)
+        form = response.context['form']
+        self.assertFormError(
+            form, 'name', _("Saved value: %(value)s") % {'value': 'new_task'}
+        )
+        self.assertTrue(form.non_field_errors())
+        self.assertEqual(Task.objects.get(id=1).name, 'new_task')
+        self.assertEqual(form['version'].value(), self.task.version)
+        self.client.post(url, {
+            **self.updated_task_data, 'name': 'stale_name',
+            'version': form['version'].value(),
+        })
+        self.assertEqual(Task.objects.get(id=1).name, 'stale_name')
+
+    def test_bulk_update_invalidates_open_forms(self):
+        self.login_user(self.user)
+        self.client.post(reverse('task_bulk'), {
+            'ids': [1], 'action': 'update', 'status': 1,
+        })
+        response = self.client.post(
+            reverse('task_update', kwargs={'pk': 1}), self.updated_task_data
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(id=1).status_id, 1)
+
     def test_update_task_missing_field(self):
         self.login_user(self.user)
         response = self.client.post(
@@ -192,6 +260,18 @@ class TestTaskDelete(BaseTestCase):
             _("Task can be deleted only by its creator.")
         )
 
+    def test_delete_task_single_fetch(self):
+        self.login_user(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('task_delete', kwargs={'pk': 1})
+            )
+        self.assertEqual(response.status_code, 200)
+        task_queries = [
+            query for query in queries if '"task_task"' in query['sql']
+        ]
+        self.assertEqual(len(task_queries), 1)
+
     def test_delete_task_unauthorized(self):
         response = self.client.post(
             reverse('task_delete', kwargs={'pk': 1}), follow=True
@@ -276,6 +356,51 @@ class TestTaskFilter(BaseTestCase):
         filtered_tasks = response.context_data['object_list']
         self.assertEqual(len(filtered_tasks), 0)
 
+    def filter_labels(self, labels, match=None):
+        data = {'labels': [label.id for label in labels]}
+        if match:
+            data['labels_match'] = match
+        request = self.factory.get(reverse('task_index'), data)
+        request.user = self.user
+        return TaskFilter(
+            request.GET, queryset=Task.objects.all(), request=request
+        ).qs
+
+    def test_labels_any_filter(self):
+        with CaptureQueriesContext(connection) as queries:
+            tasks = list(self.filter_labels([self.label2, self.label3]))
+        self.assertEqual(sorted(task.id for task in tasks), [1, 2])
+        self.assertEqual(len(queries), 2)
+        self.assertIn('EXISTS', queries[-1]['sql'])
+        self.assertEqual(
+            list(self.filter_labels([self.label1, self.label3], 'any')),
+            [Task.objects.get(id=1)]
+        )
+
+    def test_labels_all_filter(self):
+        with CaptureQueriesContext(connection) as queries:
+            tasks = list(self.filter_labels([self.label2, self.label3], 'all'))
+        self.assertEqual([task.id for task in tasks], [1])
+        self.assertEqual(len(queries), 2)
+        self.assertIn('HAVING', queries[-1]['sql'])
+        self.assertEqual(
+            self.filter_labels([self.label2], 'all').count(), 2
+        )
+        self.assertFalse(
+            self.filter_labels([self.label1, self.label2], 'all').exists()
+        )
+
+    def test_labels_filter_in_view(self):
+        request = self.factory.get(reverse('task_index'), {
+            'labels': [self.label2.id, self.label3.id],
+            'labels_match': 'all',
+        })
+        request.user = self.user
+        response = TaskIndexView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "testtask")
+        self.assertNotContains(response, "task1")
+
     def test_created_by_me_filter(self):
         request = self.factory.get(
             reverse('task_index'), {'created_by_me': 'on'}
@@ -295,3 +420,1113 @@ class TestTaskFilter(BaseTestCase):
         self.assertContains(response, "task1")
         filtered_tasks = response.context_data['object_list']
         self.assertEqual(len(filtered_tasks), 2)
+
+
+@patch.object(TaskIndexView, 'paginate_by', 3)
+class TestTaskPagination(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.status = Status.objects.get(id=1)
+        now = timezone.now()
+        Task.objects.update(created_at=now - timedelta(days=30))
+        for i in range(8):
+            Task.objects.create(
+                name=f'paged_task{i}',
+                status=self.status,
+                creator=self.user,
+                created_at=now - timedelta(days=i // 2)
+            )
+        self.expected = list(
+            Task.objects.order_by('-created_at', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def get_page(self, params):
+        response = self.client.get(reverse('task_index'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_walk_forward_and_back(self):
+        self.login_user(self.user)
+        pages = [self.get_page({})]
+        while pages[-1].has_next():
+            pages.append(self.get_page({'cursor': pages[-1].next_cursor}))
+        ids = [task.id for page in pages for task in page]
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 4)
+        self.assertFalse(pages[0].has_previous())
+        previous = self.get_page({'cursor': pages[-1].previous_cursor})
+        self.assertEqual(
+            [task.id for task in previous], [task.id for task in pages[-2]]
+        )
+
+    def test_cursor_keeps_filter(self):
+        self.login_user(self.user)
+        params = {'status': self.status.id}
+        page = self.get_page(params)
+        page = self.get_page({**params, 'cursor': page.next_cursor})
+        self.assertTrue(all(t.status_id == self.status.id for t in page))
+        self.assertEqual(len(page), 3)
+
+    def test_query_count_does_not_grow_with_depth(self):
+        self.login_user(self.user)
+        counts = []
+        cursor = None
+        self.get_page({})
+        for i in range(3):
+            with CaptureQueriesContext(connection) as queries:
+                page = self.get_page({'cursor': cursor} if cursor else {})
+            counts.append(len(queries))
+            cursor = page.next_cursor
+        self.assertEqual(len(set(counts)), 1)
+
+    def test_invalid_cursor(self):
+        self.login_user(self.user)
+        response = self.client.get(reverse('task_index'), {'cursor': 'bad'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TestTaskQueryPlan(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.login_user(self.user)
+
+    def count_queries(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_index_query_count_is_fixed(self):
+        baseline = self.count_queries(reverse('task_index'))
+        status = Status.objects.get(id=3)
+        for executor in User.objects.all():
+            Task.objects.create(
+                name=f'task_for_{executor.id}', status=status,
+                creator=executor, executor=executor
+            )
+        self.assertEqual(self.count_queries(reverse('task_index')), baseline)
+
+    def test_page_query_count_is_fixed(self):
+        url = reverse('task_page', kwargs={'pk': 1})
+        baseline = self.count_queries(url)
+        Task.objects.get(id=1).labels.add(*Label.objects.all())
+        self.assertEqual(self.count_queries(url), baseline)
+        response = self.client.get(url)
+        for label in Label.objects.all():
+            self.assertContains(response, label.name)
+
+    def test_page_of_missing_task(self):
+        response = self.client.get(reverse('task_page', kwargs={'pk': 999}))
+        self.assertEqual(response.status_code, 404)
+
+
+class TestTaskIndexes(BaseTestCase):
+
+    def test_default_ordering(self):
+        Task.objects.filter(id=1).update(created_at=timezone.now())
+        self.assertEqual(Task.objects.first().id, 1)
+
+    def test_explain_every_filter_combination(self):
+        out = StringIO()
+        call_command('explain_task_filters', stdout=out)
+        output = out.getvalue()
+        self.assertEqual(output.count('-- next page'), 17)
+        self.assertIn('status, executor, labels, created_by_me', output)
+        self.assertIn('labels_match=all', output)
+        if connection.vendor in ('sqlite', 'postgresql'):
+            self.assertIn('task_created_idx', output)
+            self.assertIn('task_status_created_idx', output)
+            self.assertIn('task_label_label_task_idx', output)
+
+
+class TestTaskChoices(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.login_user(self.user)
+
+    def get_choice_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        tables = ('"status_status"', '"label_label"', '"user_user"')
+        return [
+            query['sql'] for query in queries
+            if query['sql'].startswith(tuple(f'SELECT {t}' for t in tables))
+            and 'WHERE' not in query['sql']
+        ]
+
+    def test_choices_are_served_from_cache(self):
+        for url in (reverse('task_create'), reverse('task_index')):
+            self.get_choice_queries(url)
+            self.assertEqual(self.get_choice_queries(url), [])
+
+    def test_choices_follow_changes(self):
+        self.client.get(reverse('task_create'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Status.objects.create(name='brand_new_status')
+            label = Label.objects.get(id=1)
+            label.name = 'renamed_label'
+            label.save()
+        response = self.client.get(reverse('task_create'))
+        self.assertContains(response, 'brand_new_status')
+        self.assertContains(response, 'renamed_label')
+        response = self.client.get(reverse('task_index'))
+        self.assertContains(response, 'renamed_label')
+
+    def test_login_does_not_invalidate_user_choices(self):
+        version = get_version(User)
+        self.login_user(User.objects.get(id=2))
+        self.assertEqual(get_version(User), version)
+
+
+class TestTaskBulk(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.other_user = User.objects.get(id=2)
+        self.status = Status.objects.get(id=1)
+        self.label1 = Label.objects.get(id=1)
+        self.label2 = Label.objects.get(id=2)
+        self.login_user(self.user)
+
+    def post_bulk(self, data):
+        return self.client.post(reverse('task_bulk'), data, follow=True)
+
+    def test_bulk_form(self):
+        response = self.client.get(reverse('task_bulk'), {'ids': [1, 2]})
+        self.assertContains(response, _("Selected tasks: %(count)s") % {
+            'count': 2
+        })
+        response = self.client.get(
+            reverse('task_bulk'), {'query': 'created_by_me=on'}
+        )
+        self.assertContains(response, _("Selected tasks: %(count)s") % {
+            'count': 1
+        })
+
+    def test_bulk_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_bulk({
+                'ids': [1, 2], 'action': 'update',
+                'status': self.status.id, 'executor': self.other_user.id,
+                'add_labels': [self.label1.id],
+                'remove_labels': [self.label2.id]
+            })
+        updates = [
+            q for q in queries if q['sql'].startswith('UPDATE "task_task" ')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertRedirectWithMessage(
+            response, 'task_index',
+            _("Tasks processed: %(count)s") % {'count': 2}
+        )
+        for task in Task.objects.filter(id__in=[1, 2]):
+            self.assertEqual(task.status, self.status)
+            self.assertEqual(task.executor, self.other_user)
+            self.assertIn(self.label1, task.labels.all())
+            self.assertNotIn(self.label2, task.labels.all())
+
+    def test_bulk_update_by_filter(self):
+        self.post_bulk({
+            'query': f'status={Status.objects.get(id=3).id}',
+            'action': 'update', 'status': self.status.id
+        })
+        self.assertEqual(Task.objects.get(id=2).status, self.status)
+        self.assertNotEqual(Task.objects.get(id=1).status, self.status)
+
+    def test_bulk_by_filter_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('task_bulk'), {
+                'query': 'created_by_me=on&labels_match=any',
+                'action': 'update', 'status': self.status.id
+            })
+        self.assertEqual(Task.objects.get(id=1).status, self.status)
+        self.assertNotEqual(Task.objects.get(id=2).status, self.status)
+        batches = [
+            q['sql'] for q in queries
+            if q['sql'].startswith('SELECT "task_task"."id" FROM')
+            and '"task_task"."creator_id" = ' in q['sql']
+        ]
+        self.assertEqual(len(batches), 2)
+        self.assertTrue(all('LIMIT 500' in sql for sql in batches))
+
+    def test_bulk_without_selection_is_rejected(self):
+        count = Task.objects.count()
+        for query in ('', 'labels_match=all&archived=on', 'status=999'):
+            with self.subTest(query=query):
+                response = self.post_bulk({
+                    'query': query, 'action': 'delete'
+                })
+                self.assertContains(
+                    response,
+                    _("Select tasks or filter the task list first.")
+                )
+                self.assertEqual(Task.objects.count(), count)
+
+    def test_bulk_delete_reports_failures(self):
+        response = self.post_bulk({'ids': [1, 2, 999], 'action': 'delete'})
+        self.assertFalse(Task.objects.filter(id=1).exists())
+        self.assertTrue(Task.objects.filter(id=2).exists())
+        self.assertContains(
+            response, "#2: " + _("Task can be deleted only by its creator.")
+        )
+        self.assertContains(response, "#999: " + _("Task does not exist."))
+
+    def test_bulk_is_atomic(self):
+        with patch(
+            'task_manager.task.bulk.TaskLabel.objects.bulk_create',
+            side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.post_bulk({
+                'ids': [1], 'action': 'update', 'status': self.status.id,
+                'add_labels': [self.label1.id]
+            })
+        self.assertNotEqual(Task.objects.get(id=1).status, self.status)
+
+    def test_bulk_unauthorized(self):
+        self.client.logout()
+        response = self.post_bulk({'ids': [1], 'action': 'delete'})
+        self.assertRedirectWithMessage(response)
+        self.assertTrue(Task.objects.filter(id=1).exists())
+
+
+class TestTaskExport(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.login_user(self.user)
+
+    def export(self, data):
+        response = self.client.get(reverse('task_export'), data)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_export_csv(self):
+        response, content = self.export({'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), Task.objects.count())
+        task = Task.objects.get(id=1)
+        row = next(row for row in rows if row['id'] == '1')
+        self.assertEqual(row['status'], task.status.name)
+        self.assertEqual(row['creator'], str(task.creator))
+        self.assertEqual(
+            row['labels'].split('; '),
+            [label.name for label in task.labels.all()]
+        )
+
+    def test_export_ndjson_filtered(self):
+        status = Status.objects.get(id=2)
+        response, content = self.export({
+            'format': 'ndjson', 'status': status.id
+        })
+        rows = [json.loads(line) for line in content.splitlines()]
+        expected = Task.objects.filter(status=status)
+        self.assertEqual(
+            [row['id'] for row in rows], [task.id for task in expected]
+        )
+        self.assertTrue(all(row['status'] == status.name for row in rows))
+
+    def test_export_bounded_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.export({'format': 'ndjson'})
+        self.assertLessEqual(len(queries), 4)
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            reverse('task_export'), {'format': 'ndjson'}
+        )
+        self.assertTrue(response.is_async)
+        content = b''.join([
+            chunk async for chunk in response.streaming_content
+        ]).decode()
+        self.assertEqual(
+            len(content.splitlines()), await Task.objects.acount()
+        )
+
+    def test_export_invalid_request(self):
+        response = self.client.get(reverse('task_export'), {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('task_export'), {'status': 999})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestTaskImport(BaseTestCase):
+    csv_data = (
+        "name,description,status,executor,labels\n"
+        "imported1,first,teststatus,testuser_update,testlabel; new_label\n"
+        "imported2,,new_status,,\n"
+        "imported1,duplicate,teststatus,,\n"
+        "testtask,existing,teststatus,,\n"
+        "imported3,,teststatus,nobody,\n"
+        ",no name,teststatus,,\n"
+    )
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.login_user(self.user)
+
+    def import_file(self, content, suffix='.csv'):
+        with NamedTemporaryFile('w', suffix=suffix) as file:
+            file.write(content)
+            file.flush()
+            out, err = StringIO(), StringIO()
+            call_command(
+                'import_tasks', file.name, username=self.user.username,
+                stdout=out, stderr=err
+            )
+        return out.getvalue(), err.getvalue()
+
+    def test_import_command(self):
+        out, err = self.import_file(self.csv_data)
+        self.assertIn("2 tasks imported", out)
+        self.assertEqual(err.count("Row"), 4)
+        task = Task.objects.get(name='imported1')
+        self.assertEqual(task.creator, self.user)
+        self.assertEqual(task.executor.username, 'testuser_update')
+        self.assertEqual(
+            sorted(task.labels.values_list('name', flat=True)),
+            ['new_label', 'testlabel']
+        )
+        self.assertEqual(
+            Task.objects.get(name='imported2').status.name, 'new_status'
+        )
+        self.assertFalse(Task.objects.filter(name='imported3').exists())
+        self.assertEqual(Task.objects.filter(name='imported1').count(), 1)
+
+    def test_import_without_labels_column(self):
+        out, err = self.import_file(
+            'name,status,description\nno_labels,teststatus,plain\n'
+        )
+        self.assertIn("1 tasks imported", out)
+        self.assertFalse(
+            Task.objects.get(name='no_labels').labels.exists()
+        )
+
+    def test_import_queries_do_not_grow_with_rows(self):
+        def import_queries(count):
+            rows = [
+                {'name': f'bulk{count}_{i}', 'status': 'teststatus',
+                 'labels': ['testlabel', 'label_in_use']}
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                self.import_file(json.dumps(rows), suffix='.json')
+            return len(queries)
+
+        self.assertEqual(import_queries(5), import_queries(50))
+        self.assertEqual(
+            Task.objects.filter(name__startswith='bulk').count(), 55
+        )
+
+    def test_import_view(self):
+        rows = '\n'.join(json.dumps(row) for row in [
+            {'name': 'uploaded', 'status': 'teststatus', 'labels': []},
+            {'name': 'task1', 'status': 'teststatus'},
+        ])
+        response = self.client.post(reverse('task_import'), {
+            'file': SimpleUploadedFile('tasks.ndjson', rows.encode()),
+        }, follow=True)
+        self.assertRedirectWithMessage(
+            response, 'task_index',
+            _("Tasks processed: %(count)s") % {'count': 1}
+        )
+        self.assertContains(response, _("Row %(row)s: %(message)s") % {
+            'row': 2, 'message': _("Task with this name already exists.")
+        })
+        self.assertTrue(Task.objects.filter(name='uploaded').exists())
+
+    def test_import_reports_invalid_values_per_row(self):
+        long_name = 'x' * 151
+        result = importer.import_tasks(self.user, [
+            {'name': 'numbered', 'status': 'teststatus', 'labels': 5},
+            {'name': 'nested', 'status': 'teststatus', 'labels': [{}]},
+            {'name': 'long_status', 'status': long_name},
+            {'name': 'long_label', 'status': 'teststatus',
+             'labels': [long_name]},
+            {'name': 'valid', 'status': 'teststatus', 'labels': [1]},
+            {'name': 'unlabelled', 'status': 'teststatus'},
+        ])
+        self.assertEqual(result.failures, [
+            (1, _('Labels must be a list or a string separated by ";".')),
+            (2, _('Labels must be a list or a string separated by ";".')),
+            (3, _("Status name is too long.")),
+            (4, _("Label name is too long.")),
+        ])
+        tasks = {task.name: task for task in Task.objects.filter(
+            id__in=result.done
+        )}
+        self.assertEqual(set(tasks), {'valid', 'unlabelled'})
+        self.assertEqual(
+            list(tasks['valid'].labels.values_list('name', flat=True)),
+            ['1']
+        )
+        self.assertFalse(tasks['unlabelled'].labels.exists())
+        self.assertFalse(Status.objects.filter(name=long_name).exists())
+
+    def test_import_view_invalid_file(self):
+        response = self.client.post(reverse('task_import'), {
+            'file': SimpleUploadedFile('tasks.txt', b'name'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['form'].is_valid())
+        response = self.client.post(reverse('task_import'), {
+            'file': SimpleUploadedFile('tasks.json', b'{"name": 1}'),
+        })
+        self.assertIn('file', response.context['form'].errors)
+
+
+class TestTaskSearch(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.status = Status.objects.get(id=1)
+        self.in_description = Task.objects.create(
+            name='Fix login', description='the deploy script broke',
+            status=self.status, creator=self.user
+        )
+        self.in_name = Task.objects.create(
+            name='Deploy release', description='ship it',
+            status=self.status, creator=self.user
+        )
+        self.login_user(self.user)
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('task_index'), {'search': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_ranked_prefix_search(self):
+        page = self.search('depl')
+        self.assertEqual(
+            [task.id for task in page],
+            [self.in_name.id, self.in_description.id]
+        )
+        self.assertEqual(len(self.search('deploy broke')), 1)
+        self.assertEqual(len(self.search('"(*')), 0)
+
+    def test_index_follows_writes(self):
+        self.in_name.name = 'Renamed'
+        self.in_name.save()
+        self.in_description.delete()
+        Task.objects.bulk_create([Task(
+            name='Deployment checklist', status=self.status,
+            creator=self.user
+        )])
+        self.assertEqual(
+            [task.name for task in self.search('deploy')],
+            ['Deployment checklist']
+        )
+        self.assertEqual(len(self.search('renamed')), 1)
+
+    @patch.object(TaskIndexView, 'paginate_by', 1)
+    def test_ranked_pagination(self):
+        first = self.search('deploy')
+        second = self.search('deploy', cursor=first.next_cursor)
+        self.assertEqual(
+            [task.id for task in [*first, *second]],
+            [self.in_name.id, self.in_description.id]
+        )
+        self.assertFalse(second.has_next())
+
+
+class TestTaskCounts(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.other_user = User.objects.get(id=2)
+        self.status = Status.objects.get(id=1)
+        self.label = Label.objects.get(id=1)
+        self.login_user(self.user)
+
+    def assertCountsMatch(self):
+        stored = {
+            (kind, key_id, status_id): count
+            for kind, key_id, status_id, count in TaskCount.objects.exclude(
+                count=0
+            ).values_list('kind', 'key_id', 'status_id', 'count')
+        }
+        self.assertEqual(stored, dict(counters.snapshot()))
+        self.assertEqual(
+            dict(Label.objects.values_list('id', 'task_count')),
+            {
+                label.id: label.task_set.count()
+                for label in Label.objects.all()
+            }
+        )
+
+    def test_counts_follow_task_views(self):
+        self.assertCountsMatch()
+        self.client.post(reverse('task_create'), {
+            'name': 'counted', 'status': self.status.id,
+            'executor': self.other_user.id, 'labels': [self.label.id]
+        })
+        self.assertCountsMatch()
+        task = Task.objects.get(name='counted')
+        self.client.post(reverse('task_update', args=[task.id]), {
+            'name': 'counted', 'status': 2, 'labels': [2, 3],
+            'version': task.version,
+        })
+        self.assertEqual(Task.objects.get(id=task.id).status_id, 2)
+        self.assertCountsMatch()
+        self.label.task_set.add(task)
+        self.assertCountsMatch()
+        self.client.post(reverse('task_delete', args=[task.id]))
+        self.assertFalse(Task.objects.filter(id=task.id).exists())
+        self.assertCountsMatch()
+
+    def test_counts_follow_bulk_changes(self):
+        self.client.post(reverse('task_bulk'), {
+            'ids': [1, 2], 'action': 'update', 'status': self.status.id,
+            'executor': self.user.id, 'add_labels': [self.label.id],
+            'remove_labels': [2]
+        })
+        self.assertCountsMatch()
+        self.client.post(reverse('task_bulk'), {
+            'ids': [1, 2], 'action': 'delete'
+        })
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertCountsMatch()
+        importer.import_tasks(self.user, [
+            {'name': 'imported', 'status': 'teststatus', 'labels': 'new'}
+        ])
+        self.assertCountsMatch()
+
+    def test_rebuild_command(self):
+        TaskCount.objects.update(count=100)
+        out = StringIO()
+        call_command('rebuild_task_counts', stdout=out)
+        self.assertIn("counters rebuilt", out.getvalue())
+        self.assertCountsMatch()
+
+    def test_stale_instances_keep_counts(self):
+        first, second = Task.objects.get(id=1), Task.objects.get(id=1)
+        first.status_id = 2
+        first.save()
+        second.executor = self.other_user
+        second.save()
+        self.assertCountsMatch()
+        first.labels.remove(2)
+        second.labels.remove(2)
+        self.assertCountsMatch()
+
+    def test_dashboard(self):
+        Task.objects.create(
+            name='mine', status=self.status, creator=self.user,
+            executor=self.user
+        )
+        response = self.client.get(reverse('index'))
+        statuses = {
+            row['id']: row for row in response.context['dashboard']['statuses']
+        }
+        self.assertEqual(statuses[self.status.id]['executor'], 1)
+        self.assertEqual(statuses[self.status.id]['creator'], 1)
+        self.assertEqual(statuses[2]['creator'], 1)
+        labels = {
+            row['id']: row['count']
+            for row in response.context['dashboard']['labels']
+        }
+        self.assertEqual(labels, {2: 2, 3: 1})
+        self.client.logout()
+        response = self.client.get(reverse('index'))
+        self.assertNotIn('dashboard', response.context)
+
+
+@skipUnless(
+    connection.features.has_select_for_update,
+    "Overlapping transactions need row locks"
+)
+class TestTaskCountsConcurrency(TransactionTestCase):
+    fixtures = BaseTestCase.fixtures
+    assertCountsMatch = TestTaskCounts.assertCountsMatch
+
+    def setUp(self):
+        counters.rebuild()
+
+    def run_in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connections.close_all()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_overlapping_updates_keep_counts(self):
+        first, second = Task.objects.get(id=1), Task.objects.get(id=1)
+        saved, release = threading.Event(), threading.Event()
+
+        def save_first():
+            with transaction.atomic():
+                first.status_id = 2
+                first.save()
+                first.labels.remove(2)
+                saved.set()
+                release.wait(5)
+
+        def save_second():
+            saved.wait(5)
+            second.executor_id = 2
+            second.save()
+            second.labels.remove(2)
+
+        threads = [self.run_in_thread(save_first),
+                   self.run_in_thread(save_second)]
+        # Gives the second save time to reach the lock of the first one.
+        time.sleep(0.5)
+        release.set()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(Task.objects.get(id=1).executor_id, 2)
+        self.assertCountsMatch()
+
+
+class TestTaskFragments(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.task = Task.objects.get(id=1)
+        self.login_user(self.user)
+
+    def get_index(self):
+        return self.client.get(reverse('task_index'))
+
+    def test_cache_is_shared_between_processes(self):
+        self.assertNotIsInstance(caches['default'], LocMemCache)
+        self.assertGreater(caches['default']._max_entries, 300)
+
+    def get_page(self):
+        return self.client.get(reverse('task_page', args=[self.task.id]))
+
+    def test_unchanged_rows_come_from_cache(self):
+        self.get_index()
+        Task.objects.filter(id=self.task.id).update(name='not_rendered')
+        self.assertContains(self.get_index(), 'testtask')
+        self.task.refresh_from_db()
+        self.task.save()
+        self.assertContains(self.get_index(), 'not_rendered')
+
+    def test_related_changes_bump_rows(self):
+        self.get_index()
+        self.task.status.name = 'renamed_status'
+        self.task.status.save()
+        self.task.creator.first_name = 'Renamed'
+        self.task.creator.save()
+        response = self.get_index()
+        self.assertContains(response, '<td>renamed_status</td>', html=True)
+        self.assertContains(
+            response, f'<td>Renamed {self.task.creator.last_name}</td>',
+            html=True
+        )
+
+    def test_bulk_update_bumps_rows(self):
+        self.get_index()
+        self.client.post(reverse('task_bulk'), {
+            'ids': [self.task.id], 'action': 'update', 'status': 1
+        })
+        self.assertContains(
+            self.get_index(), f'<td>{Status.objects.get(id=1).name}</td>',
+            html=True
+        )
+
+    def test_label_changes_bump_card(self):
+        self.get_page()
+        label = Label.objects.get(id=2)
+        label.name = 'renamed_label'
+        label.save()
+        self.assertContains(self.get_page(), 'renamed_label')
+        self.task.labels.add(Label.objects.get(id=1))
+        self.assertContains(self.get_page(), 'testlabel')
+        Label.objects.get(id=1).task_set.remove(self.task)
+        self.assertNotContains(self.get_page(), 'testlabel')
+
+
+class TestTaskConditionalGet(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.task = Task.objects.get(id=1)
+        self.login_user(self.user)
+        self.index_url = reverse('task_index')
+        self.page_url = reverse('task_page', args=[self.task.id])
+        # The first response sets the CSRF cookie.
+        self.client.get(self.index_url)
+
+    def revalidate(self, url, response, **params):
+        return self.client.get(
+            url, params, headers={'if-none-match': response['ETag']}
+        )
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get(self.index_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.revalidate(self.index_url, response)
+        self.assertEqual(cached.status_code, 304)
+        self.assertFalse(any('task_task' in q['sql'] for q in queries))
+        self.assertEqual(
+            self.revalidate(self.index_url, response, status=1).status_code,
+            200
+        )
+
+    def test_list_changes_after_writes(self):
+        response = self.client.get(self.index_url)
+        self.client.post(reverse('task_bulk'), {
+            'ids': [self.task.id], 'action': 'update', 'status': 1
+        })
+        self.client.get(self.index_url)
+        self.assertEqual(
+            self.revalidate(self.index_url, response).status_code, 200
+        )
+        response = self.client.get(self.index_url)
+        self.task.creator.last_name = 'Renamed'
+        self.task.creator.save()
+        self.assertEqual(
+            self.revalidate(self.index_url, response).status_code, 200
+        )
+
+    def test_list_version_is_shared_through_the_database(self):
+        response = self.client.get(self.index_url)
+        # A command run from cron doesn't share this process's cache.
+        with patch('task_manager.task.fragments.cache', caches['sessions']):
+            call_command(
+                'archive_tasks', status=['status_in_use'], days=0,
+                stdout=StringIO()
+            )
+        self.assertEqual(
+            self.revalidate(self.index_url, response).status_code, 200
+        )
+
+    def test_list_changes_after_related_delete(self):
+        label = Label.objects.create(name='short-lived')
+        response = self.client.get(self.index_url)
+        self.assertContains(response, 'short-lived')
+        label.delete()
+        response = self.revalidate(self.index_url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'short-lived')
+
+    def test_page_changes_after_writes(self):
+        response = self.client.get(self.page_url)
+        self.assertEqual(
+            self.revalidate(self.page_url, response).status_code, 304
+        )
+        self.task.labels.add(Label.objects.get(id=1))
+        self.assertEqual(
+            self.revalidate(self.page_url, response).status_code, 200
+        )
+        response = self.client.get(self.page_url)
+        self.assertEqual(self.client.get(self.page_url, headers={
+            'if-modified-since': response['Last-Modified']
+        }).status_code, 304)
+        status = self.task.status
+        status.name = 'renamed_status'
+        status.save()
+        self.assertEqual(
+            self.revalidate(self.page_url, response).status_code, 200
+        )
+
+    def test_pending_messages_are_rendered(self):
+        response = self.client.get(self.index_url)
+        self.client.post(reverse('task_bulk'), {
+            'ids': [999], 'action': 'delete'
+        })
+        self.assertEqual(
+            self.revalidate(self.index_url, response).status_code, 200
+        )
+
+
+class TestTaskHistory(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.login_user(self.user)
+        self.task_data = {
+            'name': 'testtask', 'description': '', 'status': 2,
+            'labels': [2, 3], 'version': Task.objects.get(id=1).version,
+        }
+
+    def update(self, **changes):
+        with CaptureQueriesContext(connection) as queries, (
+            self.captureOnCommitCallbacks(execute=True)
+        ):
+            self.client.post(
+                reverse('task_update', kwargs={'pk': 1}),
+                {**self.task_data, **changes}
+            )
+        return [
+            q for q in queries
+            if q['sql'].startswith('INSERT INTO "task_taskchange"')
+        ]
+
+    def get_changes(self, task_id):
+        return list(TaskChange.objects.filter(task_id=task_id).values_list(
+            'user_id', 'changes'
+        ))
+
+    def test_update_records_changed_fields(self):
+        inserts = self.update(status=1, executor=2, labels=[1, 3])
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.get_changes(1), [(1, {
+            'status': [2, 1],
+            'executor': [None, 2],
+            'labels': {'added': [1], 'removed': [2]},
+        })])
+
+    def test_deferred_fields_stay_deferred(self):
+        task = Task.objects.defer('status', 'executor').get(id=1)
+        task.name = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        self.assertEqual(
+            task.get_deferred_fields(), {'status_id', 'executor_id'}
+        )
+        self.assertEqual(self.get_changes(1), [
+            (None, {'name': ['testtask', 'renamed']})
+        ])
+
+    def test_fixture_loads_are_not_recorded(self):
+        Task.objects.get(id=1).labels.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('loaddata', 'tasks.json', verbosity=0)
+        self.assertEqual(Task.objects.get(id=1).labels.count(), 2)
+        self.assertFalse(TaskChange.objects.exists())
+
+    def test_async_middleware_records_changes(self):
+        async def get_response(request):
+            await sync_to_async(history.record)(
+                1, fields=[('name', 'testtask', 'renamed')]
+            )
+            return HttpResponse()
+
+        middleware = history.HistoryMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.user = self.user
+        with self.captureOnCommitCallbacks(execute=True):
+            async_to_sync(middleware)(request)
+        self.assertEqual(self.get_changes(1), [
+            (1, {'name': ['testtask', 'renamed']})
+        ])
+
+    def test_unchanged_update_records_nothing(self):
+        self.assertEqual(self.update(), [])
+        self.assertFalse(TaskChange.objects.exists())
+
+    def test_bulk_update_records_every_task(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task_bulk'), {
+                'ids': [1, 2], 'action': 'update', 'status': 1,
+                'add_labels': [1], 'remove_labels': [2, 3],
+            })
+        self.assertEqual(self.get_changes(1), [(1, {
+            'status': [2, 1], 'labels': {'added': [1], 'removed': [2, 3]},
+        })])
+        self.assertEqual(self.get_changes(2), [(1, {
+            'status': [3, 1], 'labels': {'added': [1], 'removed': [2]},
+        })])
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        with patch(
+            'task_manager.task.bulk.TaskLabel.objects.bulk_create',
+            side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError), (
+            self.captureOnCommitCallbacks(execute=True)
+        ):
+            self.client.post(reverse('task_bulk'), {
+                'ids': [1], 'action': 'update', 'status': 1,
+                'add_labels': [1],
+            })
+        self.assertFalse(TaskChange.objects.exists())
+
+    def test_deleted_task_keeps_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task_delete', kwargs={'pk': 1}))
+        self.assertEqual(
+            self.get_changes(1), [(1, {'name': ['testtask', None]})]
+        )
+        response = self.client.get(reverse('task_history', kwargs={'pk': 1}))
+        self.assertContains(response, 'testtask')
+
+    def test_history_is_loaded_lazily(self):
+        TaskChange.objects.create(task_id=1, changes={'status': [2, 1]})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task_page', kwargs={'pk': 1}))
+        self.assertContains(
+            response, reverse('task_history', kwargs={'pk': 1})
+        )
+        self.assertFalse(
+            [q for q in queries if 'task_taskchange' in q['sql']]
+        )
+        response = self.client.get(reverse('task_history', kwargs={'pk': 1}))
+        self.assertContains(response, Status.objects.get(id=1).name)
+
+    def test_history_pages(self):
+        start = timezone.now()
+        TaskChange.objects.bulk_create([
+            TaskChange(
+                task_id=1, user=self.user,
+                created_at=start - timedelta(minutes=number),
+                changes={'name': [f'old{number}', f'new{number}']},
+            )
+            for number in range(25)
+        ])
+        url = reverse('task_history', kwargs={'pk': 1})
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['changes']), 20)
+        self.assertContains(response, 'new0')
+        response = self.client.get(url, {
+            'cursor': response.context['page_obj'].next_cursor
+        })
+        self.assertEqual(
+            [change.changes['name'][1] for change in response.context[
+                'changes'
+            ]],
+            [f'new{number}' for number in range(20, 25)]
+        )
+
+    def test_prune_command(self):
+        old = TaskChange.objects.create(task_id=1, changes={})
+        TaskChange.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(days=40)
+        )
+        TaskChange.objects.create(task_id=1, changes={})
+        out = StringIO()
+        call_command(
+            'prune_task_history', days=30, batch_size=1, stdout=out
+        )
+        self.assertIn('1 history entries deleted', out.getvalue())
+        self.assertEqual(TaskChange.objects.count(), 1)
+        self.assertFalse(TaskChange.objects.filter(id=old.id).exists())
+
+
+class TestTaskArchive(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+        self.login_user(self.user)
+        self.done = Status.objects.get(id=2)
+        Task.objects.filter(id=1).update(
+            updated_at=timezone.now() - timedelta(days=40)
+        )
+
+    def archive(self, **options):
+        out = StringIO()
+        call_command(
+            'archive_tasks', status=[self.done.name], days=30,
+            stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_archive_moves_old_done_tasks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            output = self.archive(batch_size=1)
+        self.assertIn('1 tasks archived', output)
+        self.assertFalse(Task.objects.filter(id=1).exists())
+        archived = ArchivedTask.objects.get(id=1)
+        self.assertEqual(archived.name, 'testtask')
+        self.assertEqual(archived.status, self.done)
+        self.assertEqual(
+            sorted(archived.labels.values_list('id', flat=True)), [2, 3]
+        )
+        self.assertEqual(Label.objects.get(id=2).task_count, 1)
+        self.assertEqual(Label.objects.get(id=3).task_count, 0)
+        self.assertFalse(TaskCount.objects.filter(
+            kind=TaskCount.CREATOR, key_id=1, count__gt=0
+        ).exists())
+        self.assertFalse(TaskChange.objects.exists())
+
+    def test_recent_and_other_tasks_stay(self):
+        Task.objects.filter(id=1).update(updated_at=timezone.now())
+        self.assertIn('0 tasks would be archived', self.archive(dry_run=True))
+        self.assertIn('0 tasks archived', self.archive())
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_unknown_status(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_tasks', status=['missing'])
+
+    def test_index_reads_hot_table_by_default(self):
+        self.archive()
+        response = self.client.get(reverse('task_index'))
+        self.assertEqual(
+            [task.id for task in response.context['tasks']], [2]
+        )
+        self.assertNotContains(response, 'testtask')
+        response = self.client.get(reverse('task_index'), {
+            'archived': 'on', 'per_page': 1
+        })
+        self.assertEqual(
+            [task.id for task in response.context['tasks']], [2]
+        )
+        response = self.client.get(reverse('task_index'), {
+            'archived': 'on', 'per_page': 1,
+            'cursor': response.context['page_obj'].next_cursor,
+        })
+        self.assertEqual(
+            [task.id for task in response.context['tasks']], [1]
+        )
+        self.assertContains(response, _("Archived"))
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_archived_filters(self):
+        self.archive()
+        response = self.client.get(reverse('task_index'), {
+            'archived': 'on', 'labels': [3], 'search': 'testtask',
+        })
+        self.assertEqual(
+            [task.id for task in response.context['tasks']], [1]
+        )
+
+    def test_search_with_archive_orders_by_date(self):
+        self.archive()
+        now = timezone.now()
+        for days, name in ((1, 'testtask testtask newer'),
+                           (500, 'testtask older')):
+            Task.objects.create(
+                name=name, status=self.done, creator=self.user,
+                created_at=now - timedelta(days=days)
+            )
+        expected = sorted(
+            [*Task.objects.search('testtask'),
+             *ArchivedTask.objects.search('testtask')],
+            key=lambda task: (task.created_at, task.id), reverse=True
+        )
+        seen, cursor = [], None
+        while True:
+            params = {'archived': 'on', 'search': 'testtask', 'per_page': 1}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.client.get(
+                reverse('task_index'), params
+            ).context['page_obj']
+            seen += [task.id for task in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, [task.id for task in expected])
+        self.assertEqual(len(seen), 3)
+
+    def test_archived_tasks_protect_their_references(self):
+        self.archive()
+        response = self.client.get(reverse('label_index'))
+        self.assertEqual(Label.objects.get(id=3).task_count, 0)
+        self.assertNotContains(
+            response, reverse('label_delete', kwargs={'pk': 3})
+        )
+        self.client.post(reverse('status_delete', kwargs={'pk': 2}))
+        self.assertTrue(Status.objects.filter(id=2).exists())
+        self.client.post(reverse('label_delete', kwargs={'pk': 3}))
+        self.assertTrue(Label.objects.filter(id=3).exists())
+        self.client.post(reverse('user_delete', kwargs={'pk': 1}))
+        self.assertTrue(User.objects.filter(id=1).exists())
@@ -1,19 +1,44 @@
 from django.urls import path
 
+from task_manager.utils import select_view
 from . import views
 
 urlpatterns = [
-    path('', views.TaskIndexView.as_view(), name='task_index'),
+    path(
+        '',
+        select_view(views.TaskIndexView, views.AsyncTaskIndexView),
+        name='task_index'
+    ),
     path(
         'create/',
         views.TaskFormCreateView.as_view(),
         name='task_create'
     ),
+    path(
+        'export/',
+        views.TaskExportView.as_view(),
+        name='task_export'
+    ),
+    path(
+        'import/',
+        views.TaskImportView.as_view(),
+        name='task_import'
+    ),
+    path(
+        'bulk/',
+        views.TaskBulkView.as_view(),
+        name='task_bulk'
+    ),
     path(
         '<int:pk>/',
-        views.TaskPageView.as_view(),
+        select_view(views.TaskPageView, views.AsyncTaskPageView),
         name='task_page'
     ),
+    path(
+        '<int:pk>/history/',
+        views.TaskHistoryView.as_view(),
+        name='task_history'
+    ),
     path(
         '<int:pk>/update/',
         views.TaskFormUpdateView.as_view(),
@@ -1,34 +1,185 @@
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
-from django.shortcuts import redirect, render
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    HttpResponseBadRequest,
+    QueryDict,
+    StreamingHttpResponse,
+)
+from django.shortcuts import (
+    aget_object_or_404,
+    get_object_or_404,
+    redirect,
+    render,
+)
 from django.utils.translation import gettext as _
 from django.views import View
-from django.views.generic.edit import CreateView, DeleteView, UpdateView
+from django.views.generic import ListView
+from django.views.generic.edit import (
+    CreateView,
+    DeleteView,
+    FormView,
+    UpdateView,
+)
 from django_filters.views import FilterView
 
 from task_manager import utils
+from task_manager.task import bulk, export, fragments, history, importer
 from task_manager.task.filters import TaskFilter
-from task_manager.task.forms import TaskForm
-from task_manager.task.models import Task
+from task_manager.task.forms import TaskBulkForm, TaskForm, TaskImportForm
+from task_manager.task.models import Task, TaskChange
 
 
-class TaskIndexView(utils.UserLoginRequiredMixin, FilterView):
+class TaskIndexView(
+    utils.UserLoginRequiredMixin, utils.ConditionalGetMixin,
+    utils.IndexViewMixin, FilterView
+):
     model = Task
     template_name = 'pages/index_task.html'
     context_object_name = 'tasks'
     filterset_class = TaskFilter
+    keyset_ordering = ('-created_at', '-id')
+    sort_fields = ('id', 'created_at')
+
+    def get_queryset(self):
+        return Task.objects.for_list()
+
+    def get_etag_parts(self):
+        self.list_version, self.list_changed_at = (
+            fragments.get_list_version()
+        )
+        return [self.list_version, self.request.GET.urlencode()]
+
+    def get_last_modified(self):
+        return self.list_changed_at
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        fragments.stamp(context['tasks'])
+        context['fragment_timeout'] = settings.FRAGMENT_CACHE_TIMEOUT
+        return context
+
+    def get_paginator(self, queryset, per_page, *args, **kwargs):
+        if not self.filterset.include_archived():
+            return super().get_paginator(queryset, per_page, *args, **kwargs)
+        return utils.MergedKeysetPaginator(
+            [queryset, self.filterset.get_archived_qs()], per_page,
+            ordering=self.get_keyset_ordering()
+        )
+
+    def get_keyset_ordering(self):
+        ranked = 'search_rank' in self.object_list.query.annotations
+        # The archive ranks matches on another scale than the search index,
+        # so a list merged with it is ordered by date.
+        if ranked and self.get_sort() is None and (
+            not self.filterset.include_archived()
+        ):
+            return ('-search_rank', '-id')
+        return super().get_keyset_ordering()
+
+
+class AsyncTaskIndexView(utils.AsyncIndexViewMixin, TaskIndexView):
+
+    def get_object_list(self):
+        self.filterset = self.get_filterset(self.get_filterset_class())
+        if not self.filterset.is_bound or self.filterset.is_valid() or (
+            not self.get_strict()
+        ):
+            return self.filterset.qs
+        return self.filterset.queryset.none()
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(filter=self.filterset, **kwargs)
+
+
+class TaskExportView(utils.UserLoginRequiredMixin, View):
+    chunk_size = 2000
 
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in export.FORMATS:
+            return HttpResponseBadRequest(_("Unknown export format"))
+        filterset = TaskFilter(
+            request.GET, queryset=Task.objects.all(), request=request
+        )
+        if not filterset.is_valid():
+            return HttpResponseBadRequest(filterset.errors.as_text())
+        serialize, content_type = export.FORMATS[export_format]
+        lines = serialize(export.iter_rows(filterset.qs, self.chunk_size))
+        if isinstance(request, ASGIRequest):
+            lines = export.aiter_batches(lines)
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="tasks.{export_format}"'
+        )
+        return response
+
+
+class TaskPageView(
+    utils.UserLoginRequiredMixin, utils.ConditionalGetMixin, View
+):
 
-class TaskPageView(utils.UserLoginRequiredMixin, View):
+    def get_etag_parts(self):
+        self.watermark = fragments.get_task_watermark(self.kwargs['pk'])
+        return self.watermark
+
+    def get_last_modified(self):
+        updated_at, *versions = self.watermark
+        return max(updated_at, *map(fragments.to_datetime, versions))
 
     def get(self, request, *args, **kwargs):
-        task_id = kwargs.get('pk')
-        task = Task.objects.get(id=task_id)
-        return render(request, 'pages/page_task.html', context={
-            'task': task
+        task = get_object_or_404(
+            Task.objects.for_page(), id=kwargs.get('pk')
+        )
+        return self.render_task(task)
+
+    def render_task(self, task):
+        fragments.stamp([task], with_labels=True)
+        return render(self.request, 'pages/page_task.html', context={
+            'task': task,
+            'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
         })
 
 
+class AsyncTaskPageView(TaskPageView):
+
+    async def get(self, request, *args, **kwargs):
+        task = await aget_object_or_404(
+            Task.objects.for_page(), id=kwargs.get('pk')
+        )
+        return await sync_to_async(self.render_task)(task)
+
+
+class TaskHistoryView(
+    utils.UserLoginRequiredMixin, utils.KeysetPaginationMixin, ListView
+):
+    # Rendered into the history tab of the task page on demand. The task
+    # itself isn't loaded, the history of a deleted task stays readable.
+    template_name = 'partials/task_history.html'
+    context_object_name = 'changes'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return TaskChange.objects.filter(
+            task_id=self.kwargs['pk']
+        ).select_related('user').only(
+            'id', 'created_at', 'changes',
+            'user__first_name', 'user__last_name'
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        names = history.get_names()
+        for change in context['changes']:
+            change.rows = history.describe(change.changes, names)
+        context['task_id'] = self.kwargs['pk']
+        return context
+
+
 class TaskFormCreateView(
     utils.CreateViewMixin, utils.UserLoginRequiredMixin,
     SuccessMessageMixin, CreateView
@@ -60,11 +211,121 @@ class TaskFormDeleteView(
 ):
     model = Task
 
+    def get_queryset(self):
+        return Task.objects.for_delete()
+
     def dispatch(self, request, *args, **kwargs):
-        self.obj = self.get_object()
-        if request.user.is_authenticated and self.obj.creator != request.user:
+        if request.user.is_authenticated and (
+            self.get_object().creator_id != request.user.id
+        ):
             messages.error(
                 request, _("Task can be deleted only by its creator.")
             )
             return redirect('task_index')
         return super().dispatch(request, *args, **kwargs)
+
+
+class ResultReportMixin:
+    max_reported_failures = 20
+
+    def report(self, result):
+        if result.done:
+            messages.success(
+                self.request,
+                _("Tasks processed: %(count)s") % {'count': len(result.done)}
+            )
+        for key, message in result.failures[:self.max_reported_failures]:
+            messages.error(self.request, self.format_failure(key, message))
+        hidden = len(result.failures) - self.max_reported_failures
+        if hidden > 0:
+            messages.error(
+                self.request,
+                _("%(count)s more tasks failed") % {'count': hidden}
+            )
+
+    def format_failure(self, task_id, message):
+        return f"#{task_id}: {message}"
+
+
+class TaskBulkView(
+    utils.UserLoginRequiredMixin, ResultReportMixin, FormView
+):
+    form_class = TaskBulkForm
+    template_name = 'layouts/form_base.html'
+
+    def get_initial(self):
+        return {
+            'ids': self.request.GET.getlist('ids'),
+            'query': self.request.GET.get('query', ''),
+        }
+
+    def get_filterset(self, query):
+        return TaskFilter(
+            QueryDict(query), queryset=Task.objects.all(),
+            request=self.request
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'heading': _("Bulk edit tasks"),
+            'button_text': _("Apply"),
+        })
+        if not context['form'].is_bound:
+            initial = self.get_initial()
+            count = len(initial['ids']) or (
+                self.get_filterset(initial['query']).qs.count()
+            )
+            context['delete_prompt'] = (
+                _("Selected tasks: %(count)s") % {'count': count}
+            )
+        return context
+
+    def form_valid(self, form):
+        ids = form.cleaned_data['ids']
+        if not ids:
+            # An empty filter would select every task in the table.
+            filterset = self.get_filterset(form.cleaned_data['query'])
+            if not filterset.has_conditions():
+                form.add_error(
+                    None, _("Select tasks or filter the task list first.")
+                )
+                return self.form_invalid(form)
+            ids = filterset.qs
+        result = bulk.run_bulk(self.request.user, ids, **form.get_changes())
+        self.report(result)
+        return redirect('task_index')
+
+
+class TaskImportView(
+    utils.UserLoginRequiredMixin, ResultReportMixin, FormView
+):
+    form_class = TaskImportForm
+    template_name = 'layouts/form_base.html'
+    batch_size = 1000
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'heading': _("Import tasks"),
+            'button_text': _("Import"),
+        })
+        return context
+
+    def form_valid(self, form):
+        file = io.TextIOWrapper(
+            form.cleaned_data['file'], encoding='utf-8-sig', newline=''
+        )
+        try:
+            rows = importer.read_rows(file, form.cleaned_data['format'])
+        except importer.ImportFormatError as error:
+            form.add_error('file', str(error))
+            return self.form_invalid(form)
+        result = importer.import_tasks(
+            self.request.user, rows, batch_size=self.batch_size
+        )
+        self.report(result)
+        return redirect('task_index')
+
+    def format_failure(self, row, message):
+        return _("Row %(row)s: %(message)s") % {'row': row, 'message': message}
@@ -0,0 +1,431 @@
+import importlib
+import json
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils.translation import gettext as _
+
+from task_manager.benchmarks import (
+    VIEW_BUDGETS,
+    compare_session_profiles,
+    generate_tasks,
+    iter_url_names,
+    measure_all,
+    percentile,
+    summarize,
+)
+from task_manager.performance import PerformanceMiddleware
+from task_manager.reporting import (
+    MemorySink,
+    Report,
+    ReportQueue,
+    get_report_queue,
+)
+from task_manager.task.models import Task
+from task_manager.task.views import TaskIndexView
+from task_manager.user.models import User
+from task_manager.utils import BaseTestCase, KeysetPaginator
+from task_manager.warmup import iter_template_names, warm_up_templates
+
+
+class TestViewBudgets(BaseTestCase):
+
+    def setUp(self):
+        self.user = User.objects.get(id=1)
+
+    def assertWithinBudget(self):
+        for m in measure_all(self.client, self.user):
+            with self.subTest(view=m.name):
+                self.assertLess(m.status_code, 400)
+                self.assertLessEqual(m.queries, m.budget)
+                self.assertGreater(m.total_time, 0)
+
+    def test_every_view_has_budget(self):
+        names = {name for name, needs_pk in iter_url_names()}
+        self.assertEqual(names, set(VIEW_BUDGETS))
+
+    def test_views_within_budget(self):
+        self.assertWithinBudget()
+
+    def test_views_within_budget_on_generated_data(self):
+        generate_tasks(300, batch_size=100)
+        self.assertEqual(Task.objects.count(), 302)
+        self.assertWithinBudget()
+
+    def test_generate_tasks_is_repeatable(self):
+        generate_tasks(20)
+        Task.objects.filter(name='bench_task3').delete()
+        generate_tasks(20)
+        self.assertEqual(Task.objects.count(), 41)
+        self.assertTrue(Task.objects.filter(name='bench_task39').exists())
+        self.assertEqual(User.objects.filter(
+            username__startswith='bench_user'
+        ).count(), 20)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_views', username=self.user.username,
+            host='testserver', stdout=out
+        )
+        self.assertIn('task_index', out.getvalue())
+
+
+class TestTemplateWarmUp(BaseTestCase):
+
+    def test_cached_loader_without_dead_dirs(self):
+        engine = engines['django'].engine
+        self.assertEqual(engine.dirs, [])
+        self.assertIsInstance(engine.template_loaders[0], CachedLoader)
+
+    def test_warm_up_compiles_project_and_packs(self):
+        loaded, failed = warm_up_templates()
+        self.assertEqual(failed, [])
+        self.assertTrue(
+            set(iter_template_names(['task_manager'])) <= set(loaded)
+        )
+        self.assertIn('bootstrap5/field.html', loaded)
+
+    def test_no_template_reads_after_warm_up(self):
+        warm_up_templates()
+        self.client.force_login(User.objects.get(id=1))
+        with patch.object(
+            FilesystemLoader, 'get_contents',
+            side_effect=AssertionError("template read from disk")
+        ):
+            for name in ('index', 'task_index', 'task_create'):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+
+def reload_urls():
+    for name in ('task', 'status', 'label', 'user'):
+        importlib.reload(importlib.import_module(f'task_manager.{name}.urls'))
+    importlib.reload(importlib.import_module('task_manager.urls'))
+    clear_url_caches()
+
+
+class TestAsyncViews(BaseTestCase):
+    read_views = ('task_index', 'status_index', 'label_index', 'user_index')
+
+    def setUp(self):
+        with self.settings(ASYNC_VIEWS=True):
+            reload_urls()
+        self.addCleanup(reload_urls)
+        self.user = User.objects.get(id=1)
+
+    def test_read_views_are_async(self):
+        for name in self.read_views:
+            with self.subTest(view=name):
+                self.assertTrue(
+                    resolve(reverse(name)).func.view_class.view_is_async
+                )
+        self.assertTrue(resolve(
+            reverse('task_page', args=[1])
+        ).func.view_class.view_is_async)
+        self.assertFalse(
+            resolve(reverse('task_create')).func.view_class.view_is_async
+        )
+
+    def test_read_views_render_same_rows(self):
+        self.login_user(self.user)
+        response = self.client.get(reverse('task_index'), {'status': 2})
+        self.assertEqual(
+            [task.id for task in response.context['tasks']],
+            list(Task.objects.filter(status=2).order_by(
+                '-created_at', '-id'
+            ).values_list('id', flat=True))
+        )
+        self.assertContains(response, 'testtask')
+        self.assertContains(
+            self.client.get(reverse('task_page', args=[1])), 'testtask'
+        )
+        self.assertEqual(
+            self.client.get(reverse('task_page', args=[999])).status_code,
+            404
+        )
+
+    def test_async_client(self):
+        async def get_pages():
+            await self.async_client.aforce_login(self.user)
+            return [
+                await self.async_client.get(reverse(name))
+                for name in self.read_views
+            ]
+
+        for response in async_to_sync(get_pages)():
+            self.assertEqual(response.status_code, 200)
+
+    def test_login_required(self):
+        response = self.client.get(reverse('task_index'), follow=True)
+        self.assertRedirectWithMessage(response)
+        self.assertEqual(
+            self.client.get(reverse('user_index')).status_code, 200
+        )
+
+    def test_conditional_get(self):
+        self.login_user(self.user)
+        url = reverse('task_index')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(
+            url, headers={'if-none-match': response['ETag']}
+        ).status_code, 304)
+
+    def test_views_within_budget(self):
+        for m in measure_all(self.client, self.user):
+            with self.subTest(view=m.name):
+                self.assertLess(m.status_code, 400)
+                self.assertLessEqual(m.queries, m.budget)
+
+    def test_async_page_matches_sync_page(self):
+        generate_tasks(30)
+        paginator = KeysetPaginator(Task.objects.all(), 7)
+        page = paginator.page()
+        async_page = async_to_sync(paginator.apage)(page.next_cursor)
+        self.assertEqual(
+            list(async_page), list(paginator.page(page.next_cursor))
+        )
+        self.assertEqual(
+            async_page.previous_cursor,
+            paginator.page(page.next_cursor).previous_cursor
+        )
+
+
+class TestLoadSummary(BaseTestCase):
+
+    def test_percentile(self):
+        values = [i / 100 for i in range(100, 0, -1)]
+        self.assertEqual(percentile(values, 0.5), 0.51)
+        self.assertEqual(percentile(values, 0.99), 1.0)
+        self.assertEqual(percentile([0.2], 0.95), 0.2)
+
+    def test_summarize_counts_errors(self):
+        summary = summarize([(0.1, True), (0.3, False), (0.2, True)], 2.0)
+        self.assertEqual(summary['requests'], 3)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['throughput'], 1.5)
+        self.assertEqual(summary['max'], 0.3)
+
+
+class BlockingSink(MemorySink):
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.threads = set()
+
+    def send(self, reports):
+        self.threads.add(threading.current_thread().name)
+        self.release.wait(5)
+        super().send(reports)
+
+
+class FailingSink:
+
+    def send(self, reports):
+        raise ConnectionError("rollbar is down")
+
+
+class TestReportQueue(BaseTestCase):
+
+    def test_reports_are_sent_in_batches_off_thread(self):
+        sink = BlockingSink()
+        reports = ReportQueue(sink, batch_size=3, flush_interval=0.01)
+        sink.release.set()
+        for i in range(7):
+            self.assertTrue(reports.put(Report(message=str(i))))
+        self.assertTrue(reports.flush(5))
+        self.assertEqual(
+            [report.message for report in sink.reports],
+            [str(i) for i in range(7)]
+        )
+        self.assertTrue(all(len(batch) <= 3 for batch in sink.batches))
+        self.assertEqual(sink.threads, {'report-queue'})
+        self.assertEqual(reports.stats(), {
+            'queued': 0, 'sent': 7, 'failed': 0, 'dropped': 0
+        })
+
+    def test_full_queue_drops_and_reports_drops(self):
+        sink = BlockingSink()
+        reports = ReportQueue(
+            sink, maxsize=2, batch_size=1, flush_interval=0.01
+        )
+        reports.put(Report(message='first'))
+        while reports.stats()['queued']:
+            time.sleep(0.001)
+        results = [reports.put(Report(message=str(i))) for i in range(5)]
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(reports.stats()['dropped'], 3)
+        sink.release.set()
+        self.assertTrue(reports.flush(5))
+        messages = [report.message for report in sink.reports]
+        self.assertEqual(messages[:2], ['first', '0'])
+        self.assertIn('3 error reports dropped, queue is full', messages)
+        self.assertEqual(reports.stats()['sent'], 3)
+
+    def test_failing_sink_is_counted(self):
+        reports = ReportQueue(FailingSink(), flush_interval=0.01)
+        with self.assertLogs('task_manager.reporting', 'ERROR'):
+            reports.put(Report(message='lost'))
+            self.assertTrue(reports.flush(5))
+        self.assertEqual(reports.stats()['failed'], 1)
+
+    def test_middleware_writes_to_file_sink(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'reports.jsonl'
+        self.client.force_login(User.objects.get(id=1))
+        self.client.raise_request_exception = False
+        with override_settings(
+            ERROR_REPORT_SINK='file', ERROR_REPORT_FILE=path,
+            ERROR_REPORT_FLUSH_INTERVAL=0.01
+        ), patch.object(
+            TaskIndexView, 'get_queryset', side_effect=RuntimeError('boom')
+        ):
+            response = self.client.get(reverse('task_index'))
+            self.assertEqual(response.status_code, 500)
+            self.assertTrue(get_report_queue().flush(5))
+        report = json.loads(path.read_text())
+        self.assertEqual(report['message'], 'RuntimeError: boom')
+        self.assertEqual(report['path'], reverse('task_index'))
+        self.assertIn('get_queryset', report['traceback'])
+
+
+class TestSessionProfiles(BaseTestCase):
+
+    def setUp(self):
+        self.task = Task.objects.get(id=1)
+
+    def test_profiles_save_queries(self):
+        results = compare_session_profiles(
+            'testuser', 'correct_password', self.task, warm_up=False
+        )
+        for profile, steps in results.items():
+            with self.subTest(profile=profile):
+                self.assertEqual(
+                    [step.status_code for step in steps],
+                    [200, 302, 200, 200, 302, 200]
+                )
+        totals = {
+            profile: sum(step.queries for step in steps)
+            for profile, steps in results.items()
+        }
+        self.assertLess(totals['cached_db'], totals['db'])
+        self.assertLess(totals['signed_cookies'], totals['cached_db'])
+        self.assertEqual(
+            Task.objects.get(id=1).updated_at, self.task.updated_at
+        )
+
+    def test_signed_cookies_without_session_table(self):
+        with override_settings(**settings.SESSION_PROFILES['signed_cookies']):
+            self.login_user(User.objects.get(id=1))
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('label_create'), {'name': 'cookie_label'},
+                    follow=True
+                )
+        self.assertContains(response, _("Label is created successfully"))
+        self.assertFalse(
+            any('django_session' in query['sql'] for query in queries)
+        )
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_sessions', username='testuser',
+            password='correct_password', host='testserver', stdout=out
+        )
+        self.assertIn('signed_cookies', out.getvalue())
+        self.assertIn('saved', out.getvalue())
+
+
+class TestPerformanceMiddleware(BaseTestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(id=1))
+
+    def get_timings(self, response):
+        return dict(
+            part.split(';')[0:2]
+            for part in response['Server-Timing'].split(', ')
+        )
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('task_manager.performance', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('task_index'))
+        timings = self.get_timings(response)
+        self.assertEqual(
+            list(timings), ['db', 'db-slowest', 'render', 'view', 'total']
+        )
+        self.assertIn(
+            f'desc="{len(queries)} queries"', response['Server-Timing']
+        )
+        record = logs.records[0].performance
+        self.assertEqual(record['url_name'], 'task_index')
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], len(queries))
+        # Which query is the slowest depends on timing, not on the view.
+        self.assertTrue(record['slowest_sql'].startswith('SELECT'))
+        self.assertGreater(record['render_ms'], 0)
+        self.assertLessEqual(record['view_ms'], record['total_ms'])
+        self.assertLessEqual(record['db_slowest_ms'], record['db_ms'])
+        self.assertEqual(json.loads(logs.records[0].getMessage()), record)
+
+    @override_settings(
+        PERFORMANCE_SAMPLE_RATE=1, PERFORMANCE_SERVER_TIMING=False
+    )
+    def test_log_only(self):
+        with self.assertLogs('task_manager.performance', 'INFO'):
+            response = self.client.get(reverse('task_page', args=[1]))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0.25)
+    def test_sampling(self):
+        with patch('random.random', return_value=0.5):
+            response = self.client.get(reverse('task_index'))
+        self.assertNotIn('Server-Timing', response)
+        with patch('random.random', return_value=0.1), self.assertLogs(
+            'task_manager.performance', 'INFO'
+        ):
+            response = self.client.get(reverse('task_index'))
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_async_requests_stay_async(self):
+        async def get_response(request):
+            await sync_to_async(list)(Task.objects.all())
+            return HttpResponse()
+
+        middleware = PerformanceMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        with self.assertLogs('task_manager.performance', 'INFO') as logs:
+            response = async_to_sync(middleware)(request)
+        self.assertIn('Server-Timing', response)
+        self.assertEqual(logs.records[0].performance['queries'], 1)
+
+    def test_disabled_middleware_is_not_loaded(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            PerformanceMiddleware(lambda request: None)
+        response = self.client.get(reverse('task_index'))
+        self.assertNotIn('Server-Timing', response)
@@ -9,6 +9,7 @@ urlpatterns = [
     path('statuses/', include('task_manager.status.urls')),
     path('tasks/', include('task_manager.task.urls')),
     path('labels/', include('task_manager.label.urls')),
+    path('api/', include('task_manager.api.urls')),
     path('admin/', admin.site.urls),
     path('login/', views.UserLoginView.as_view(), name='login'),
     path('logout/', views.UserLogoutView.as_view(), name='logout'),
@@ -95,6 +95,14 @@ class TestUserRead(BaseTestCase):
         response = self.client.get(reverse('user_index'))
         self.assertEqual(response.status_code, 200)
 
+    def test_read_users_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user_index'), {'sort': '-id'})
+        self.assertEqual(
+            [user.id for user in response.context['users']],
+            list(User.objects.order_by('-id').values_list('id', flat=True))
+        )
+
     def test_read_nonexistent(self):
         response = self.client.get('/wrong_url/')
         self.assertEqual(response.status_code, 404)
@@ -1,9 +1,14 @@
 from django.urls import path
 
+from task_manager.utils import select_view
 from . import views
 
 urlpatterns = [
-    path('', views.IndexView.as_view(), name='user_index'),
+    path(
+        '',
+        select_view(views.IndexView, views.AsyncIndexView),
+        name='user_index'
+    ),
     path(
         'create/',
         views.UserFormCreateView.as_view(),
@@ -9,14 +9,20 @@ from task_manager.user.forms import UserForm
 from task_manager.user.models import User
 
 
-class IndexView(ListView):
+class IndexView(utils.IndexViewMixin, ListView):
     model = User
     template_name = 'pages/index_user.html'
+    context_object_name = 'users'
+    sort_fields = ('id', 'username')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['users'] = User.objects.all()
-        return context
+    def get_queryset(self):
+        return User.objects.only(
+            'id', 'username', 'first_name', 'last_name', 'created_at'
+        )
+
+
+class AsyncIndexView(utils.AsyncIndexViewMixin, IndexView):
+    pass
 
 
 class UserFormCreateView(
@@ -53,3 +59,7 @@ class UserFormDeleteView(
     utils.UserPermissionMixin, SuccessMessageMixin, DeleteView
 ):
     model = User
+    in_use_relations = (
+        'created_tasks', 'executed_tasks',
+        'archived_created_tasks', 'archived_executed_tasks',
+    )
@@ -1,13 +1,45 @@
+import base64
+import binascii
+import hashlib
+import json
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django import forms
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages import get_messages
-from django.core.exceptions import ValidationError
-from django.db.models import ProtectedError
-from django.shortcuts import redirect
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import transaction
+from django.db.models import (
+    BooleanField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    Model,
+    OuterRef,
+    ProtectedError,
+    Q,
+    QuerySet,
+)
+from django.forms.models import model_to_dict
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect
 from django.test import TestCase
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    quote_etag,
+)
+from django.utils.http import http_date
+from django.utils.translation import get_language
 from django.utils.translation import gettext as _
 
+from task_manager.task import counters
+
 TRANSLATION_MAP = {
     ('create', 'label'): {
         'success_message': _("Label is created successfully"),
@@ -61,6 +93,11 @@ TRANSLATION_MAP = {
 class BaseTestCase(TestCase):
     fixtures = ["users.json", "tasks.json", "statuses.json", "labels.json"]
 
+    @classmethod
+    def setUpTestData(cls):
+        # Fixture loads leave the counters alone.
+        counters.rebuild()
+
     def login_user(self, user):
         self.client.login(
             username=user.username,
@@ -78,8 +115,86 @@ class BaseTestCase(TestCase):
         self.assertContains(response, message)
 
 
+class ConditionalGetMixin:
+    # Answers GET with 304 when get_etag_parts() says nothing has changed,
+    # before the view runs any of its own queries.
+
+    def get_etag_parts(self):
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.async_conditional_dispatch(request, *args, **kwargs)
+        validators = self.get_validators(request)
+        if validators is None:
+            return super().dispatch(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, *validators
+        ) or super().dispatch(request, *args, **kwargs)
+        return self.patch_validators(response, *validators)
+
+    async def async_conditional_dispatch(self, request, *args, **kwargs):
+        validators = await sync_to_async(self.get_validators)(request)
+        if validators is None:
+            return await super().dispatch(request, *args, **kwargs)
+        response = get_conditional_response(
+            request, *validators
+        ) or await super().dispatch(request, *args, **kwargs)
+        return self.patch_validators(response, *validators)
+
+    def get_validators(self, request):
+        # Pending messages are shown only once and a page without a CSRF
+        # cookie sets a new one, both need a rendered page.
+        if request.method not in ('GET', 'HEAD') or (
+            len(get_messages(request))
+            or 'CSRF_COOKIE' not in request.META
+        ):
+            return None
+        parts = self.get_etag_parts()
+        if parts is None:
+            return None
+        last_modified = self.get_last_modified()
+        return (
+            self.get_etag(parts),
+            int(last_modified.timestamp()) if last_modified else None,
+        )
+
+    def patch_validators(self, response, etag, timestamp):
+        response.headers.setdefault('ETag', etag)
+        if timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_etag(self, parts):
+        request = self.request
+        data = repr([
+            *parts, request.user.pk, request.META.get('CSRF_COOKIE'),
+            get_language(),
+        ])
+        return quote_etag(
+            hashlib.md5(data.encode(), usedforsecurity=False).hexdigest()
+        )
+
+
 class UserLoginRequiredMixin(LoginRequiredMixin):
 
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.async_login_dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def async_login_dispatch(self, request, *args, **kwargs):
+        # Loaded with the async ORM, the lazy request.user would query the
+        # database from the event loop.
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
+
     def handle_no_permission(self):
         messages.error(self.request, _("You are not logged in! Please log in."))
         return redirect('login')
@@ -123,20 +238,128 @@ class CreateViewMixin(BaseViewMixin):
         return 'create'
 
 
-class UpdateViewMixin(BaseViewMixin):
+class ObjectViewMixin(BaseViewMixin):
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_object_cache'):
+            self._object_cache = super().get_object()
+        return self._object_cache
+
+
+class UpdateViewMixin(ObjectViewMixin):
+    # Models with a version column are saved with a compare-and-swap on it:
+    # the form carries the version it was rendered from, and the save only
+    # goes through if the row still has it. A concurrent update turns into
+    # a form error listing the values saved meanwhile instead of being
+    # overwritten, and no lock is held while the user edits.
+    version_field = 'version'
 
     def get_action(self):
         return 'update'
 
+    def is_versioned(self):
+        try:
+            self.model._meta.get_field(self.version_field)
+        except FieldDoesNotExist:
+            return False
+        return True
+
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        if self.is_versioned():
+            form.fields[self.version_field] = forms.IntegerField(
+                widget=forms.HiddenInput,
+                initial=getattr(self.object, self.version_field)
+            )
+        return form
+
+    def form_valid(self, form):
+        if not self.is_versioned():
+            return super().form_valid(form)
+        version = form.cleaned_data[self.version_field]
+        with transaction.atomic():
+            swapped = self.model._default_manager.filter(
+                pk=self.object.pk, **{self.version_field: version}
+            ).update(**{self.version_field: F(self.version_field) + 1})
+            if not swapped:
+                return self.form_conflict(form)
+            setattr(form.instance, self.version_field, version + 1)
+            return super().form_valid(form)
+
+    def form_conflict(self, form):
+        current = get_object_or_404(
+            self.model._default_manager, pk=self.object.pk
+        )
+        form.add_error(None, _(
+            "Someone else has changed this while you were editing. Check "
+            "the saved values below and submit again to overwrite them."
+        ))
+        conflicts = list(get_conflicts(form, current, self.version_field))
+        for name, value in conflicts:
+            form.add_error(name, _("Saved value: %(value)s") % {
+                'value': value
+            })
+        # Submitting again overwrites the version that was just shown.
+        form.data = form.data.copy()
+        form.data[self.version_field] = getattr(current, self.version_field)
+        return self.form_invalid(form)
+
+
+def to_comparable(value):
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, (QuerySet, list, tuple)):
+        return sorted(to_comparable(item) for item in value)
+    return value or None
+
+
+def get_conflicts(form, current, version_field):
+    # (field, saved value) for every submitted field that differs from the
+    # row as it is now.
+    saved = model_to_dict(current, fields=form._meta.fields)
+    for name in form.fields:
+        if name == version_field or name not in saved:
+            continue
+        if to_comparable(saved[name]) != to_comparable(
+            form.cleaned_data.get(name)
+        ):
+            value = getattr(current, name)
+            if hasattr(value, 'all'):
+                value = ', '.join(str(item) for item in value.all())
+            yield name, value if value not in (None, '') else '—'
 
-class DeleteViewMixin(BaseViewMixin):
+
+class DeleteViewMixin(ObjectViewMixin):
+    # Reverse relations that protect the object from deletion. They are
+    # checked with EXISTS in the query that loads the object.
+    in_use_relations = ()
 
     def get_action(self):
         return 'delete'
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.in_use_relations:
+            return queryset
+        in_use = reduce(or_, (
+            Q(Exists(self.get_relation_queryset(name)))
+            for name in self.in_use_relations
+        ))
+        return queryset.annotate(
+            in_use=ExpressionWrapper(in_use, output_field=BooleanField())
+        )
+
+    def get_relation_queryset(self, name):
+        relation = self.model._meta.get_field(name)
+        return relation.related_model._default_manager.filter(
+            **{relation.field.name: OuterRef('pk')}
+        )
+
     def get_context_data(self, *args, **kwargs):
         context = super().get_context_data(**kwargs)
-        object = self.get_object()
+        object = self.object
         context.update({
             'form': '',
             'delete_prompt': (
@@ -148,18 +371,23 @@ class DeleteViewMixin(BaseViewMixin):
         return context
 
     def form_valid(self, form):
+        if getattr(self.object, 'in_use', False):
+            return self.handle_in_use()
         try:
             return super().form_valid(form)
         except (ValidationError, ProtectedError):
-            line_ending = (
-                'they are in use' if self.get_model_name().lower() == 'user'
-                else 'it is being used'
-            )
-            name = self.get_model_name().lower()
-            messages.error(
-                self.request, _(f"Cannot delete {name} while {line_ending}")
-            )
-            return redirect(f'{name}_index')
+            return self.handle_in_use()
+
+    def handle_in_use(self):
+        line_ending = (
+            'they are in use' if self.get_model_name().lower() == 'user'
+            else 'it is being used'
+        )
+        name = self.get_model_name().lower()
+        messages.error(
+            self.request, _(f"Cannot delete {name} while {line_ending}")
+        )
+        return redirect(f'{name}_index')
 
 
 class UserPermissionMixin:
@@ -173,3 +401,266 @@ class UserPermissionMixin:
             )
             return redirect('user_index')
         return super().dispatch(request, *args, **kwargs)
+
+
+def get_value(obj, name):
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+class KeysetPage:
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    # Ordering columns must be non-null and the last one must be unique, so
+    # that every cursor points at exactly one position in the ordering.
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self.names = [name for name, descending in self.fields]
+
+    def get_ordering(self, reverse=False):
+        return [
+            f'-{name}' if descending != reverse else name
+            for name, descending in self.fields
+        ]
+
+    def encode_cursor(self, obj, direction):
+        values = [self._serialize(get_value(obj, name)) for name in self.names]
+        data = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in (self.NEXT, self.PREVIOUS) or (
+                len(values) != len(self.fields)
+            ):
+                raise ValueError
+            values = [
+                self._to_python(name, value)
+                for name, value in zip(self.names, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            raise Http404(_("Invalid cursor"))
+        return direction, values
+
+    def page(self, cursor=None):
+        direction, values = self.get_position(cursor)
+        rows = list(
+            self.get_page_queryset(values, direction == self.PREVIOUS)
+        )
+        return self.build_page(rows, direction, values)
+
+    async def apage(self, cursor=None):
+        direction, values = self.get_position(cursor)
+        rows = [
+            row async for row in
+            self.get_page_queryset(values, direction == self.PREVIOUS)
+        ]
+        return self.build_page(rows, direction, values)
+
+    def get_position(self, cursor):
+        return self.decode_cursor(cursor) if cursor else (self.NEXT, None)
+
+    def build_page(self, rows, direction, values):
+        reverse = direction == self.PREVIOUS
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+        has_next = has_more if not reverse else True
+        has_previous = values is not None if not reverse else has_more
+        return KeysetPage(
+            rows,
+            next_cursor=(
+                self.encode_cursor(rows[-1], self.NEXT)
+                if rows and has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(rows[0], self.PREVIOUS)
+                if rows and has_previous else None
+            ),
+        )
+
+    def get_page_queryset(self, values=None, reverse=False):
+        return self.seek(self.queryset, values, reverse)
+
+    def seek(self, queryset, values=None, reverse=False):
+        queryset = queryset.order_by(*self.get_ordering(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+        return queryset[:self.per_page + 1]
+
+    def _seek(self, values, reverse):
+        # (a, b) < (x, y) is spelled out as a < x OR (a = x AND b < y); the
+        # extra bound on the leading column keeps it an index range scan.
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.fields, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        name, descending = self.fields[0]
+        lookup = 'lte' if descending != reverse else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as a search rank are plain JSON numbers.
+            if not isinstance(value, (int, float)):
+                raise ValueError
+            return value
+        return field.to_python(value)
+
+    @staticmethod
+    def _serialize(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    # Pages through querysets of models that share the ordering columns, a
+    # table and its archive, as if they were one. A page reads at most
+    # per_page + 1 rows from each of them along its own index and merges
+    # the rows here. The last ordering column must be unique across all of
+    # them.
+
+    def __init__(self, querysets, per_page, ordering=('-created_at', '-id')):
+        super().__init__(querysets[0], per_page, ordering)
+        self.querysets = querysets
+
+    def get_page_queryset(self, values=None, reverse=False):
+        rows = [
+            row for queryset in self.querysets
+            for row in self.seek(queryset, values, reverse)
+        ]
+        # Stable sorts from the last column to the first.
+        for name, descending in reversed(self.fields):
+            rows.sort(
+                key=lambda row: get_value(row, name),
+                reverse=descending != reverse
+            )
+        return rows[:self.per_page + 1]
+
+    async def apage(self, cursor=None):
+        return await sync_to_async(self.page)(cursor)
+
+
+class KeysetPaginationMixin:
+    paginate_by = 50
+    paginator_class = KeysetPaginator
+    cursor_kwarg = 'cursor'
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def get_paginator(self, queryset, per_page, *args, **kwargs):
+        return self.paginator_class(
+            queryset, per_page, ordering=self.get_keyset_ordering()
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class AsyncIndexViewMixin:
+    # Async variant of an index view: the page itself is fetched with the
+    # async ORM, filtering and context building run in a worker thread and
+    # the handler renders the TemplateResponse the same way.
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await sync_to_async(self.get_object_list)()
+        paginator = self.get_paginator(
+            self.object_list, self.get_paginate_by(self.object_list)
+        )
+        self.keyset_page = await paginator.apage(
+            request.GET.get(self.cursor_kwarg)
+        )
+        self.keyset_paginator = paginator
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
+
+    def get_object_list(self):
+        return self.get_queryset()
+
+    def paginate_queryset(self, queryset, page_size):
+        page = self.keyset_page
+        return (
+            self.keyset_paginator, page, page.object_list,
+            page.has_other_pages()
+        )
+
+
+def select_view(view_class, async_view_class):
+    if settings.ASYNC_VIEWS:
+        return async_view_class.as_view()
+    return view_class.as_view()
+
+
+class IndexViewMixin(KeysetPaginationMixin):
+    keyset_ordering = ('id',)
+    # Only offer columns that have an index, otherwise every page is a sort
+    # of the whole table.
+    sort_fields = ('id',)
+    sort_kwarg = 'sort'
+    page_size_kwarg = 'per_page'
+    max_paginate_by = 200
+
+    def get_sort(self):
+        sort = self.request.GET.get(self.sort_kwarg, '')
+        return sort if sort.lstrip('-') in self.sort_fields else None
+
+    def get_keyset_ordering(self):
+        sort = self.get_sort()
+        if sort is None:
+            return self.keyset_ordering
+        if sort.lstrip('-') == 'id':
+            return (sort,)
+        return (sort, '-id' if sort.startswith('-') else 'id')
+
+    def get_paginate_by(self, queryset):
+        try:
+            per_page = int(self.request.GET[self.page_size_kwarg])
+        except (KeyError, ValueError):
+            return self.paginate_by
+        return min(max(per_page, 1), self.max_paginate_by)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        sort = self.get_sort()
+        context['sort_links'] = {
+            name: f'-{name}' if sort == name else name
+            for name in self.sort_fields
+        }
+        return context
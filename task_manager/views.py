@@ -5,12 +5,16 @@ from django.urls import reverse_lazy
 from django.utils.translation import gettext as _
 from django.views.generic.base import TemplateView
 
+from task_manager.task.counters import get_dashboard
+
 
 class IndexView(TemplateView):
     template_name = 'pages/index.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            context['dashboard'] = get_dashboard(self.request.user)
         return context
 
 
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+
+
+def iter_template_names(app_labels):
+    for label in app_labels:
+        directory = Path(apps.get_app_config(label).path) / 'templates'
+        for path in sorted(directory.rglob('*.html')):
+            yield path.relative_to(directory).as_posix()
+
+
+def warm_up_templates(app_labels=None):
+    # Only useful with the cached loader, which keeps the compiled templates
+    # for the lifetime of the worker.
+    engine = engines['django'].engine
+    loaded, failed = [], []
+    for name in iter_template_names(
+        app_labels or settings.TEMPLATE_WARMUP_APPS
+    ):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            # Packs ship templates for tag libraries this project doesn't
+            # load; they would fail on first use as well.
+            failed.append(name)
+        else:
+            loaded.append(name)
+    return loaded, failed